@@ -40,6 +40,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'flowers.cart.CartMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -56,6 +57,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'flowers.context_processors.cart',
             ],
         },
     },
@@ -76,6 +78,81 @@ DATABASES = {
     }
 }
 
+# Cache
+# The default in-process cache is per worker; point CACHE_BACKEND/CACHE_LOCATION
+# at a shared backend (Redis, Memcached) when running more than one worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Sessions are only needed for admin logins; shoppers never get one
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Cart storage backend: SignedCookieCartStore, CacheCartStore or SessionCartStore
+CART_STORAGE = os.getenv('CART_STORAGE', 'flowers.cart.SignedCookieCartStore')
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 14
+# Browsers drop cookies over ~4 KB; SignedCookieCartStore stays below this
+CART_COOKIE_MAX_BYTES = int(os.getenv('CART_COOKIE_MAX_BYTES', '3800'))
+
+# Rendered product cards are keyed by flower version, so they can live long
+PRODUCT_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds a worker trusts its cached catalog version before re-reading the
+# shared catalog_version row. Only matters with a per-process cache
+# (LocMemCache): a shared cache gets every bump at once.
+CATALOG_VERSION_TTL = int(os.getenv('CATALOG_VERSION_TTL', '2'))
+
+# Serve listing, detail and cart lookups from a per-worker in-memory catalog
+# index instead of the ORM. Catalog version bumps reach the other workers
+# within CATALOG_VERSION_TTL.
+CATALOG_INDEX_ENABLED = os.getenv('CATALOG_INDEX_ENABLED', 'False') == 'True'
+
+# 'page' for numbered pages, 'cursor' for keyset pagination of the product
+# listing (a ?cursor= parameter switches a single request to cursor mode)
+PRODUCTS_PAGINATION = os.getenv('PRODUCTS_PAGINATION', 'page')
+
+# 'icontains' matches names with a substring scan, 'fulltext' uses the ranked
+# PostgreSQL full-text index over name, category and description
+PRODUCTS_SEARCH_ENGINE = os.getenv('PRODUCTS_SEARCH_ENGINE', 'icontains')
+
+# Typeahead: suggestions per response, and the query length from which
+# trigram (typo tolerant) matches top up the prefix trie results
+SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', '8'))
+SUGGEST_FUZZY_MIN_LENGTH = int(os.getenv('SUGGEST_FUZZY_MIN_LENGTH', '3'))
+
+# Sidebar facet counts: PostgreSQL statement timeout for the aggregate (the
+# sidebar drops its counts when exceeded) and cache lifetime per catalog version
+FACETS_TIME_BUDGET_MS = int(os.getenv('FACETS_TIME_BUDGET_MS', '200'))
+FACETS_CACHE_TIMEOUT = 3600
+
+# How paginated listings count their rows: 'exact' (COUNT(*) per page),
+# 'estimate' (planner estimate from the threshold up) or 'cached' (exact,
+# cached per query and catalog version)
+PAGINATION_COUNT_MODE = os.getenv('PAGINATION_COUNT_MODE', 'exact')
+COUNT_ESTIMATE_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 3600
+
+# Part of the catalog pages' ETag; bump it on deploys that change their markup
+PAGE_ETAG_VERSION = os.getenv('PAGE_ETAG_VERSION', '1')
+
+# Upper bound on how long the cached home page (content + featured flowers)
+# is served; signals drop it as soon as either changes
+HOME_PAGE_CACHE_TIMEOUT = int(os.getenv('HOME_PAGE_CACHE_TIMEOUT', '300'))
+
+# Default window of the dashboard sales stats (read from DailySalesRollup)
+SALES_STATS_DAYS = int(os.getenv('SALES_STATS_DAYS', '30'))
+
+# Orders fetched per round trip of the streaming order export
+ORDER_EXPORT_CHUNK_SIZE = int(os.getenv('ORDER_EXPORT_CHUNK_SIZE', '2000'))
+
+# How long checkout idempotency keys are kept (purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
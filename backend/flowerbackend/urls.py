@@ -15,6 +15,7 @@ urlpatterns = [
     # Template views (main site)
     path('', template_views.home, name='home'),
     path('products/', template_views.products, name='products'),
+    path('products/suggest/', template_views.suggest, name='suggest'),
     path('product/<uuid:product_id>/', template_views.product_detail, name='product_detail'),
     path('cart/', template_views.cart, name='cart'),
     path('cart/add/<uuid:product_id>/', template_views.add_to_cart, name='add_to_cart'),
@@ -28,5 +29,8 @@ urlpatterns = [
     path('admin/', template_views.admin_login_view, name='admin_login'),
     path('admin/dashboard/', template_views.admin_dashboard, name='admin_dashboard'),
     path('admin/logout/', template_views.admin_logout, name='admin_logout'),
+    path('admin/stats/', template_views.admin_sales_stats, name='admin_sales_stats'),
+    path('admin/orders/export/', template_views.admin_export_orders, name='admin_export_orders'),
+    path('admin/orders/status/', template_views.admin_bulk_order_status, name='admin_bulk_order_status'),
     
 ]
\ No newline at end of file
@@ -0,0 +1,347 @@
+"""
+Shopping cart storage and hydration.
+
+The cart itself is a small dict ({flower_id: {'quantity': ...}}) kept by a
+pluggable storage backend selected with settings.CART_STORAGE:
+
+- SignedCookieCartStore: the cart lives in a signed cookie, no server writes
+- CacheCartStore: the cart lives in the shared cache, keyed by a cookie id
+- SessionCartStore: the cart lives in the Django session (database by default)
+
+CartMiddleware attaches the configured store to request.cart and lets it
+write its cookies on the way out. Nothing is written for visitors who never
+add an item, so pure browsing traffic does not create any server-side state.
+"""
+
+import hashlib
+import json
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .catalog import get_catalog_index, get_catalog_version
+from .models import Flower
+
+
+# ==================== STORAGE BACKENDS ====================
+class CartFullError(Exception):
+    """Raised when a cart no longer fits in its storage; the stored cart is left unchanged"""
+
+
+class BaseCartStore:
+    """Common interface for cart storage backends"""
+
+    def __init__(self, request):
+        self.request = request
+        self._data = None
+        self.modified = False
+
+    def load(self):
+        """Return the stored payload ({'items': {...}, 'count': int}) or None"""
+        raise NotImplementedError
+
+    def persist(self, data):
+        """Write the payload (or remove it when data is None)"""
+        raise NotImplementedError
+
+    def _get_data(self):
+        if self._data is None:
+            self._data = self.load() or {'items': {}, 'count': 0}
+        return self._data
+
+    @property
+    def items(self):
+        """Cart lines as {flower_id: {'quantity': ..., ...}}"""
+        return self._get_data()['items']
+
+    @property
+    def count(self):
+        """Total quantity in the cart, answered without hydrating it"""
+        return self._get_data()['count']
+
+    def save(self, items):
+        """Replace the cart contents"""
+        data = {
+            'items': items,
+            'count': sum(item.get('quantity', 1) for item in items.values()),
+        }
+        try:
+            self.persist(data if items else None)
+        except CartFullError:
+            # Views edit the items in place; reload the stored cart instead
+            self._data = None
+            raise
+        self._data = data
+        self.modified = True
+
+    def clear(self):
+        self.save({})
+
+    def signature(self):
+        """Short digest of the cart contents, for validators of pages that show it"""
+        payload = json.dumps(self._get_data(), sort_keys=True, default=str)
+        return hashlib.md5(payload.encode()).hexdigest()
+
+    def process_response(self, response):
+        """Hook for backends that need to set cookies on the response"""
+        return response
+
+
+class SessionCartStore(BaseCartStore):
+    """Keeps the cart in the Django session"""
+
+    def load(self):
+        items = self.request.session.get('cart')
+        if items is None:
+            return None
+        count = self.request.session.get('cart_count')
+        if count is None:
+            count = sum(item.get('quantity', 1) for item in items.values())
+        return {'items': items, 'count': count}
+
+    def persist(self, data):
+        if data is None:
+            self.request.session.pop('cart', None)
+            self.request.session.pop('cart_count', None)
+        else:
+            self.request.session['cart'] = data['items']
+            self.request.session['cart_count'] = data['count']
+        self.request.session.modified = True
+
+
+class SignedCookieCartStore(BaseCartStore):
+    """
+    Keeps the cart in a signed cookie, so no server-side write happens at all.
+    Carts whose snapshots would not fit in CART_COOKIE_MAX_BYTES keep only
+    the quantities (snapshots are then rebuilt on every request); carts too
+    big even for that raise CartFullError.
+    """
+    salt = 'flowers.cart'
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._cookie_value = None
+
+    def load(self):
+        value = self.request.COOKIES.get(settings.CART_COOKIE_NAME)
+        if not value:
+            return None
+        try:
+            return signing.loads(value, salt=self.salt, max_age=settings.CART_COOKIE_AGE)
+        except signing.BadSignature:
+            return None
+
+    def encode(self, data):
+        return signing.dumps(data, salt=self.salt, compress=True)
+
+    def persist(self, data):
+        # Written in process_response
+        self._cookie_value = None
+        if data is None:
+            return
+
+        value = self.encode(data)
+        if len(value) > settings.CART_COOKIE_MAX_BYTES:
+            value = self.encode({
+                'items': {
+                    flower_id: {'quantity': line.get('quantity', 1)}
+                    for flower_id, line in data['items'].items()
+                },
+                'count': data['count'],
+            })
+            if len(value) > settings.CART_COOKIE_MAX_BYTES:
+                raise CartFullError(len(value))
+        self._cookie_value = value
+
+    def process_response(self, response):
+        if not self.modified:
+            return response
+
+        if self._cookie_value:
+            response.set_cookie(
+                settings.CART_COOKIE_NAME,
+                self._cookie_value,
+                max_age=settings.CART_COOKIE_AGE,
+                httponly=True,
+                samesite='Lax',
+            )
+        else:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+        return response
+
+
+class CacheCartStore(BaseCartStore):
+    """Keeps the cart in the shared cache, keyed by a random id stored in a cookie"""
+    key_prefix = 'cart:'
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cart_id = request.COOKIES.get(settings.CART_COOKIE_NAME)
+        self._new_id = False
+
+    def load(self):
+        if not self.cart_id:
+            return None
+        return cache.get(self.key_prefix + self.cart_id)
+
+    def persist(self, data):
+        if data is None:
+            if self.cart_id:
+                cache.delete(self.key_prefix + self.cart_id)
+            return
+
+        if not self.cart_id:
+            self.cart_id = secrets.token_urlsafe(32)
+            self._new_id = True
+        cache.set(self.key_prefix + self.cart_id, data, settings.CART_COOKIE_AGE)
+
+    def process_response(self, response):
+        if not self.modified:
+            return response
+
+        if self._data and self._data['items']:
+            if self._new_id:
+                response.set_cookie(
+                    settings.CART_COOKIE_NAME,
+                    self.cart_id,
+                    max_age=settings.CART_COOKIE_AGE,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        elif self.cart_id:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+        return response
+
+
+def get_cart_store(request):
+    """Return the cart store for this request, creating it on first use"""
+    store = getattr(request, 'cart', None)
+    if store is None:
+        store = import_string(settings.CART_STORAGE)(request)
+        request.cart = store
+    return store
+
+
+class CartMiddleware:
+    """Attach the configured cart store to the request and flush its cookies"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        store = get_cart_store(request)
+        response = self.get_response(request)
+        return store.process_response(response)
+
+
+# ==================== HYDRATION ====================
+def snapshot_flower(flower, version):
+    """
+    Snapshot of the flower fields a cart line needs, stamped with the
+    catalog version it was read at
+    """
+    return {
+        'name': flower.name,
+        'price': str(flower.price_amd),
+        'sale_price': str(flower.sale_price_amd) if flower.sale_price_amd else None,
+        'category': flower.category,
+        'image': flower.main_image_url,
+        'version': version,
+    }
+
+
+def build_cart_item(flower_id, line):
+    """Build a single cart item from a snapshotted cart line"""
+    price = float(line['price'])
+    sale_price = float(line['sale_price']) if line['sale_price'] else None
+    quantity = line.get('quantity', 1)
+
+    return {
+        'id': flower_id,
+        'name': line['name'],
+        'price': price,
+        'sale_price': sale_price,
+        'image': line['image'],
+        'category': line['category'],
+        'quantity': quantity,
+        'subtotal': price * quantity,
+        'sale_subtotal': (sale_price or price) * quantity,
+    }
+
+
+def refresh_snapshots(cart, version):
+    """
+    Revalidate cart lines stamped with an older catalog version.
+    Stale flowers come from the catalog index, or from one in_bulk query
+    when the index is disabled; lines whose flower is gone or inactive are
+    dropped.
+    Returns True when the cart was changed.
+    """
+    stale = [
+        flower_id for flower_id, line in cart.items()
+        if line.get('version', 0) < version
+    ]
+    if not stale:
+        return False
+
+    if settings.CATALOG_INDEX_ENABLED:
+        index = get_catalog_index()
+        flowers = {str(flower_id): index.get(flower_id) for flower_id in stale}
+    else:
+        flowers = Flower.objects.filter(is_active=True).in_bulk(stale)
+        flowers = {str(pk): flower for pk, flower in flowers.items()}
+
+    for flower_id in stale:
+        flower = flowers.get(str(flower_id))
+        if flower is None:
+            del cart[flower_id]
+            continue
+        line = cart[flower_id]
+        line.update(snapshot_flower(flower, version))
+    return True
+
+
+def hydrate_cart(cart):
+    """
+    Turn a stored cart ({flower_id: {'quantity': ..., snapshot...}}) into
+    cart items, revalidating only the lines older than the catalog version.
+    """
+    if not cart:
+        return []
+
+    refresh_snapshots(cart, get_catalog_version())
+    return [build_cart_item(flower_id, line) for flower_id, line in cart.items()]
+
+
+def get_cart_context(request):
+    """
+    Hydrate the cart for views and templates.
+    Lines carry price snapshots, so the database is only consulted when the
+    catalog changed since they were taken. The result is memoized on the
+    request, so views that touch the cart more than once only pay once.
+    """
+    cached = getattr(request, '_cart_context', None)
+    if cached is not None:
+        return cached
+
+    store = get_cart_store(request)
+    cart = store.items
+    if refresh_snapshots(cart, get_catalog_version()):
+        store.save(cart)
+
+    cart_items = [build_cart_item(flower_id, line) for flower_id, line in cart.items()]
+    context = {
+        'cart_items': cart_items,
+        'cart_total': sum(item['sale_subtotal'] for item in cart_items),
+        'cart_count': sum(item['quantity'] for item in cart_items),
+    }
+    request._cart_context = context
+    return context
+
+
+def get_cart_count(request):
+    """Cheap cart badge count kept by the store, without touching the Flower table"""
+    return get_cart_store(request).count
@@ -0,0 +1,155 @@
+"""
+Catalog versioning and the in-process catalog index.
+
+The catalog version is a monotonically increasing number stored in the
+one-row catalog_version table, so every worker sees the same value. It is
+bumped (after commit) whenever a Flower or FlowerImage changes, so
+anything derived from the catalog can be stamped with the version it was
+built from and revalidated only when the catalog has moved on.
+
+Reads go through the default cache for CATALOG_VERSION_TTL seconds. With a
+shared cache (Redis, Memcached) a bump reaches every worker at once; with
+a per-process cache such as LocMemCache the other workers pick it up from
+the table within the TTL.
+
+CatalogIndex is a per-worker, read-only snapshot of the active catalog used
+by the listing, detail and cart code when settings.CATALOG_INDEX_ENABLED is
+on. It is rebuilt as a whole and swapped in when the version changes.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import CatalogVersion, Flower
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def load_catalog_version():
+    """Read the shared catalog version, creating its row if it is missing"""
+    version = CatalogVersion.objects.filter(pk=CatalogVersion.SINGLETON_ID).values_list(
+        'version', flat=True
+    ).first()
+    if version is None:
+        record, _ = CatalogVersion.objects.get_or_create(
+            pk=CatalogVersion.SINGLETON_ID, defaults={'version': time.time_ns()}
+        )
+        version = record.version
+    return version
+
+
+def get_catalog_version():
+    """Return the current catalog version, from the cache for up to CATALOG_VERSION_TTL seconds"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = load_catalog_version()
+        cache.set(CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+def bump_catalog_version():
+    """Move the catalog to a new version"""
+    # A timestamp, but never moving backwards even with clocks skewed between hosts
+    CatalogVersion.objects.filter(pk=CatalogVersion.SINGLETON_ID).update(
+        version=Greatest(F('version') + 1, Value(time.time_ns()))
+    )
+    version = load_catalog_version()
+    cache.set(CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+# ==================== CATALOG INDEX ====================
+class CatalogIndex:
+    """
+    Immutable in-memory view of the active catalog.
+    Flowers are kept pre-sorted by -created_at with their images attached,
+    plus secondary indexes (sorted positions) by category and by color.
+    """
+
+    def __init__(self, flowers, version):
+        self.version = version
+        self.flowers = tuple(
+            sorted(flowers, key=lambda flower: (flower.created_at, str(flower.id)), reverse=True)
+        )
+
+        by_id = {}
+        by_category = defaultdict(list)
+        by_color = defaultdict(list)
+        for position, flower in enumerate(self.flowers):
+            by_id[str(flower.id)] = flower
+            by_category[flower.category].append(position)
+            for color in set(flower.colors or []):
+                by_color[color].append(position)
+
+        self.by_id = MappingProxyType(by_id)
+        self.by_category = MappingProxyType(
+            {key: tuple(positions) for key, positions in by_category.items()}
+        )
+        self.by_color = MappingProxyType(
+            {key: tuple(positions) for key, positions in by_color.items()}
+        )
+
+    def __len__(self):
+        return len(self.flowers)
+
+    def get(self, flower_id):
+        """Return the active flower with this id, or None"""
+        return self.by_id.get(str(flower_id))
+
+    def filter(self, category=None, color=None, search=None):
+        """Return a sequence of the matching flowers, newest first"""
+        positions = None
+        for key, index in ((category, self.by_category), (color, self.by_color)):
+            if key:
+                matches = index.get(key, ())
+                positions = matches if positions is None else sorted(
+                    set(positions).intersection(matches)
+                )
+
+        if positions is None:
+            flowers = self.flowers
+        else:
+            flowers = [self.flowers[position] for position in positions]
+
+        if search:
+            search = search.casefold()
+            flowers = [flower for flower in flowers if search in flower.name.casefold()]
+        return flowers
+
+
+_catalog_index = None
+_catalog_index_lock = threading.Lock()
+
+
+def build_catalog_index(version):
+    """Load the active catalog with its images and index it"""
+    flowers = Flower.objects.filter(is_active=True).prefetch_related('images')
+    return CatalogIndex(list(flowers), version)
+
+
+def get_catalog_index():
+    """
+    Return this worker's catalog index, rebuilding it when the catalog
+    version moved. Readers always see either the old or the new index,
+    never a half-built one.
+    """
+    global _catalog_index
+
+    version = get_catalog_version()
+    index = _catalog_index
+    if index is not None and index.version == version:
+        return index
+
+    with _catalog_index_lock:
+        index = _catalog_index
+        if index is None or index.version != version:
+            index = build_catalog_index(version)
+            _catalog_index = index
+    return index
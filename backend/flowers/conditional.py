@@ -0,0 +1,70 @@
+"""
+Conditional GET for the catalog pages (home, products, product detail).
+
+The validators are derived without touching the database: Last-Modified
+is the catalog version (bumped after every Flower, FlowerImage or
+MainPageContent write, deletes included) and the ETag hashes that version
+with everything else the page shows per visitor - the cart, the user and
+the CSRF cookie. Last-Modified cannot tell visitors apart, so it is only
+sent to anonymous visitors with an empty cart. Matching If-None-Match /
+If-Modified-Since requests get a 304 before the view runs any query or
+renders anything. Neither validator is sent while flash messages wait.
+"""
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .cart import get_cart_store
+from .catalog import get_catalog_version
+
+
+def has_pending_messages(request):
+    return bool(request.COOKIES.get(CookieStorage.cookie_name))
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    """
+    The moment of the last catalog change, or None (compare by ETag only)
+    when the page also shows messages, a cart or a signed-in user
+    """
+    user = getattr(request, 'user', None)
+    if (has_pending_messages(request) or get_cart_store(request).count
+            or (user is not None and user.is_authenticated)):
+        return None
+    return datetime.fromtimestamp(get_catalog_version() / 1e9, tz=dt_timezone.utc)
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Validator for a catalog page as this visitor sees it, or None (always
+    render) while flash messages are waiting to be shown
+    """
+    if has_pending_messages(request):
+        return None
+
+    user = getattr(request, 'user', None)
+    parts = [
+        settings.PAGE_ETAG_VERSION,
+        get_catalog_version(),
+        get_cart_store(request).signature(),
+        user.pk if user is not None and user.is_authenticated else '',
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        # The footer shows the year
+        timezone.now().year,
+    ]
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def catalog_page(view):
+    """
+    Answer conditional GETs for a catalog view. Browsers revalidate on
+    every visit (no-cache) and must not share the page (private).
+    """
+    view = condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)(view)
+    return cache_control(private=True, no_cache=True)(view)
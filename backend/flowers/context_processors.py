@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart_context, get_cart_count
+
+
+def cart(request):
+    """
+    Expose the cart to every template lazily.
+    Nothing is hydrated until a template actually reads cart_items or
+    cart_total; cart_count is answered from the counter kept in the session.
+    """
+    return {
+        'cart_items': SimpleLazyObject(lambda: get_cart_context(request)['cart_items']),
+        'cart_total': SimpleLazyObject(lambda: get_cart_context(request)['cart_total']),
+        'cart_count': SimpleLazyObject(lambda: get_cart_count(request)),
+        'current_year': datetime.now().year,
+    }
@@ -0,0 +1,102 @@
+"""
+Streaming order export.
+
+Orders and their items are written as CSV (one row per item, with the
+order columns repeated) or NDJSON (one JSON object per order, items
+nested). Rows come from .iterator(chunk_size=...), which uses a
+server-side cursor on PostgreSQL and prefetches the items chunk by chunk,
+so memory stays constant whatever the number of orders. The generators
+feed a StreamingHttpResponse (admin_export_orders view) or a file
+(export_orders command).
+"""
+
+import csv
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import OrderItem
+from .rollup import day_start
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+ORDER_COLUMNS = [
+    'id', 'created_at', 'status', 'customer_name', 'customer_email',
+    'customer_phone', 'delivery_city', 'delivery_address', 'delivery_notes',
+    'bacik_erktox', 'payment_method', 'total_amount_amd',
+]
+ITEM_COLUMNS = ['flower_id', 'flower_name', 'quantity', 'price_amd_at_purchase']
+
+# Spreadsheets evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def filter_orders(orders, status=None, date_from=None, date_to=None):
+    """Orders with the given status created between local days date_from and date_to (inclusive)"""
+    if status:
+        orders = orders.filter(status=status)
+    if date_from:
+        orders = orders.filter(created_at__gte=day_start(date_from))
+    if date_to:
+        orders = orders.filter(created_at__lt=day_start(date_to + timedelta(days=1)))
+    return orders
+
+
+def iterate_orders(orders, chunk_size):
+    """Stream orders oldest first, with only the exported columns of them and their items"""
+    orders = orders.only(*ORDER_COLUMNS).prefetch_related(Prefetch(
+        'items',
+        queryset=OrderItem.objects.only('order_id', *ITEM_COLUMNS).order_by('created_at'),
+    )).order_by('created_at', 'id')
+    return orders.iterator(chunk_size=chunk_size)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_safe(value):
+    """Text values that a spreadsheet would run as a formula, quoted with a leading apostrophe"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(orders):
+    writer = csv.writer(Echo())
+    yield writer.writerow(ORDER_COLUMNS + [f'item_{column}' for column in ITEM_COLUMNS])
+    for order in orders:
+        order_values = [csv_safe(getattr(order, column)) for column in ORDER_COLUMNS]
+        order_values[1] = order.created_at.isoformat()
+        items = order.items.all()
+        for item in items:
+            yield writer.writerow(order_values + [csv_safe(getattr(item, column)) for column in ITEM_COLUMNS])
+        if not items:
+            # Still one row, so the CSV lists the same orders as the NDJSON export
+            yield writer.writerow(order_values + [''] * len(ITEM_COLUMNS))
+
+
+def ndjson_lines(orders):
+    for order in orders:
+        record = {column: getattr(order, column) for column in ORDER_COLUMNS}
+        record['items'] = [
+            {column: getattr(item, column) for column in ITEM_COLUMNS}
+            for item in order.items.all()
+        ]
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_lines(orders, export_format, chunk_size):
+    """Lines of the export of `orders` in the given format ('csv' or 'ndjson')"""
+    rows = iterate_orders(orders, chunk_size)
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
@@ -0,0 +1,131 @@
+"""
+Category and color facet counts for the products sidebar.
+
+Counts are computed for the current filter set, with each dimension
+ignoring its own filter: category counts respect the selected color and
+color counts respect the selected category, so every option shows how
+many results picking it would give. On PostgreSQL both dimensions come
+from one aggregate query (colors are unnested with
+jsonb_array_elements_text), bounded by settings.FACETS_TIME_BUDGET_MS.
+Other databases, and the in-memory catalog index, aggregate in Python.
+
+Results are cached per catalog version, so they are recomputed only after
+the catalog changes.
+"""
+
+import hashlib
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+
+from .catalog import get_catalog_index, get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+FACETS_SQL = """
+    WITH base AS NOT MATERIALIZED ({base})
+    SELECT 'category', base.category, count(*)
+    FROM base
+    WHERE %s::text IS NULL OR base.colors @> jsonb_build_array(%s::text)
+    GROUP BY base.category
+    UNION ALL
+    SELECT 'color', color.value, count(DISTINCT base.id)
+    FROM base, jsonb_array_elements_text(base.colors) AS color(value)
+    WHERE %s::text IS NULL OR base.category = %s::text
+    GROUP BY color.value
+"""
+
+
+def facet_cache_key(category, color, filters):
+    parts = [category or '', color or ''] + [f'{key}={value}' for key, value in sorted(filters.items())]
+    digest = hashlib.md5('\x1f'.join(parts).encode()).hexdigest()
+    return f'facets:{get_catalog_version()}:{digest}'
+
+
+def count_facets_sql(base_queryset, category, color):
+    """Both facet dimensions in one aggregate query, or None past the time budget"""
+    base_sql, base_params = base_queryset.order_by().values('id', 'category', 'colors').query.sql_with_params()
+    params = (*base_params, color, color, category, category)
+
+    facets = {'categories': {}, 'colors': {}}
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SET LOCAL statement_timeout = {int(settings.FACETS_TIME_BUDGET_MS)}')
+            cursor.execute(FACETS_SQL.format(base=base_sql), params)
+            for dimension, value, count in cursor.fetchall():
+                facets['categories' if dimension == 'category' else 'colors'][value] = count
+    except OperationalError:
+        logger.warning('Facet counts exceeded %s ms, serving the sidebar without counts',
+                       settings.FACETS_TIME_BUDGET_MS)
+        return None
+    return facets
+
+
+def count_facets_python(rows, category, color):
+    """Same counts from (category, colors) pairs, for the index and non-PostgreSQL databases"""
+    categories = Counter()
+    colors = Counter()
+    for row_category, row_colors in rows:
+        row_colors = set(row_colors or [])
+        if not color or color in row_colors:
+            categories[row_category] += 1
+        if not category or category == row_category:
+            colors.update(row_colors)
+    return {'categories': dict(categories), 'colors': dict(colors)}
+
+
+def get_facets(queryset, category, color, filters, use_index=False):
+    """
+    Return {'categories': {value: count}, 'colors': {value: count}} for the
+    listing filters ('բոլորը' or empty means no filter), or None when the
+    counts could not be computed within the time budget.
+
+    `queryset` is the listing queryset with every filter applied except
+    category and color, and `filters` the values of those other filters
+    (search, prices...), which key the cache. With `use_index` the counts
+    come from the catalog index, which only supports the search filter.
+    """
+    category = category if category != 'բոլորը' else None
+    color = color if color != 'բոլորը' else None
+
+    key = facet_cache_key(category, color, filters)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    if use_index:
+        flowers = get_catalog_index().filter(search=filters.get('search'))
+        facets = count_facets_python(((f.category, f.colors) for f in flowers), category, color)
+    elif connection.vendor == 'postgresql':
+        facets = count_facets_sql(queryset, category, color)
+    else:
+        rows = queryset.values_list('category', 'colors')
+        facets = count_facets_python(rows, category, color)
+
+    if facets is not None:
+        cache.set(key, facets, settings.FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def facet_options(choices, counts, selected):
+    """
+    Sidebar options as (value, label, count) tuples: the 'all' choice, then
+    the known choices and any other values present in the catalog. Options
+    with no results are dropped unless selected. Counts are None when the
+    facets are unavailable.
+    """
+    all_choice, *known = choices
+    options = [(*all_choice, None)]
+    if counts is None:
+        return options + [(value, label, None) for value, label in known]
+
+    labels = dict(known)
+    labels.update((value, value) for value in sorted(counts) if value not in labels)
+    for value, label in labels.items():
+        count = counts.get(value, 0)
+        if count or value == selected:
+            options.append((value, label, count))
+    return options
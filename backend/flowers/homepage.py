@@ -0,0 +1,80 @@
+"""
+Cached home page data.
+
+The main page content singleton and the featured flowers are cached
+together under HOME_PAGE_KEY. Signals (flowers/signals.py) delete the
+entry after commit when the content or a featured flower changes.
+HOME_PAGE_CACHE_TIMEOUT bounds how long a fill racing with such a change
+can serve stale data.
+
+Concurrent misses are collapsed: the request that wins a cache.add lock
+fills the entry while the others wait briefly for it, and only fall back
+to querying themselves if the fill takes too long.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Flower, MainPageContent
+from .queries import card_queryset
+
+HOME_PAGE_KEY = 'home_page:v1'
+HOME_PAGE_LOCK_KEY = HOME_PAGE_KEY + ':lock'
+
+FEATURED_LIMIT = 4
+FILL_LOCK_SECONDS = 10
+FILL_WAIT_SECONDS = 2
+FILL_POLL_SECONDS = 0.05
+
+
+def load_home_page():
+    """Read the main page content and featured flowers from the database"""
+    # The singleton is created by migration 0012; never write from a page view
+    main_content = MainPageContent.objects.filter(id=MainPageContent.SINGLETON_ID).first()
+    if main_content is None:
+        main_content = MainPageContent(id=MainPageContent.SINGLETON_ID)
+
+    featured_flowers = list(card_queryset(Flower.objects.filter(
+        is_active=True,
+        to_be_on_main_page=True
+    ))[:FEATURED_LIMIT])
+    return {'main_content': main_content, 'featured_flowers': featured_flowers}
+
+
+def get_home_page():
+    """Return {'main_content', 'featured_flowers'}, from the cache when possible"""
+    data = cache.get(HOME_PAGE_KEY)
+    if data is not None:
+        return data
+
+    if not cache.add(HOME_PAGE_LOCK_KEY, 1, FILL_LOCK_SECONDS):
+        # Someone else is filling it, wait for their result
+        deadline = time.monotonic() + FILL_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(FILL_POLL_SECONDS)
+            data = cache.get(HOME_PAGE_KEY)
+            if data is not None:
+                return data
+        return load_home_page()
+
+    try:
+        data = load_home_page()
+        cache.set(HOME_PAGE_KEY, data, settings.HOME_PAGE_CACHE_TIMEOUT)
+    finally:
+        cache.delete(HOME_PAGE_LOCK_KEY)
+    return data
+
+
+def invalidate_home_page():
+    """Drop the cached home page, the next request fills it again"""
+    cache.delete(HOME_PAGE_KEY)
+
+
+def is_featured(flower_id):
+    """Whether a flower is on the currently cached home page"""
+    data = cache.get(HOME_PAGE_KEY)
+    if data is None:
+        return False
+    return any(flower.pk == flower_id for flower in data['featured_flowers'])
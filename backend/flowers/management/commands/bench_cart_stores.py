@@ -0,0 +1,135 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from flowers.models import Flower
+
+
+BACKENDS = [
+    'flowers.cart.SignedCookieCartStore',
+    'flowers.cart.CacheCartStore',
+    'flowers.cart.SessionCartStore',
+]
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class CountingCache:
+    """Thin proxy around the cache that counts writes and payload bytes"""
+
+    def __init__(self, wrapped, stats):
+        self._wrapped = wrapped
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def set(self, key, value, *args, **kwargs):
+        self._stats.add(cache_writes=1, cache_bytes=len(repr(value)))
+        return self._wrapped.set(key, value, *args, **kwargs)
+
+    def delete(self, key, *args, **kwargs):
+        self._stats.add(cache_writes=1)
+        return self._wrapped.delete(key, *args, **kwargs)
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = dict(
+            requests=0, db_writes=0, db_bytes=0,
+            cache_writes=0, cache_bytes=0, cookie_bytes=0,
+        )
+
+    def add(self, **kwargs):
+        with self._lock:
+            for key, value in kwargs.items():
+                self.values[key] += value
+
+
+class Command(BaseCommand):
+    help = 'Compare write amplification of the cart storage backends under concurrent cart updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent shoppers')
+        parser.add_argument('--updates', type=int, default=50, help='Cart updates per shopper')
+
+    def handle(self, *args, **options):
+        flower_ids = list(
+            Flower.objects.filter(is_active=True).values_list('id', flat=True)[:10]
+        )
+        if not flower_ids:
+            raise CommandError('No active flowers found, run seed_data first')
+
+        self.stdout.write(
+            f"{options['clients']} clients x {options['updates']} updates, "
+            f"{len(flower_ids)} distinct flowers\n"
+        )
+        self.stdout.write(
+            f"{'backend':<24}{'req/s':>10}{'db writes':>11}{'db bytes':>11}"
+            f"{'cache writes':>14}{'cache bytes':>13}{'cookie bytes':>14}{'writes/update':>15}"
+        )
+
+        for backend in BACKENDS:
+            stats, elapsed = self.run_backend(backend, flower_ids, options['clients'], options['updates'])
+            values = stats.values
+            writes = values['db_writes'] + values['cache_writes']
+            self.stdout.write(
+                f"{backend.rsplit('.', 1)[-1]:<24}"
+                f"{values['requests'] / elapsed:>10.0f}"
+                f"{values['db_writes']:>11}{values['db_bytes']:>11}"
+                f"{values['cache_writes']:>14}{values['cache_bytes']:>13}"
+                f"{values['cookie_bytes']:>14}"
+                f"{writes / max(values['requests'], 1):>15.2f}"
+            )
+
+    def run_backend(self, backend, flower_ids, clients, updates):
+        stats = Stats()
+        session_keys = []
+
+        def count_writes(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(WRITE_PREFIXES):
+                stats.add(db_writes=1, db_bytes=sum(len(str(p)) for p in (params or ())))
+            return execute(sql, params, many, context)
+
+        def shopper(index):
+            client = Client()
+            try:
+                with connection.execute_wrapper(count_writes):
+                    for step in range(updates):
+                        flower_id = flower_ids[(index + step) % len(flower_ids)]
+                        response = client.post(
+                            reverse('add_to_cart', args=[flower_id]), {'quantity': 1}
+                        )
+                        cookie = response.cookies.get(settings.CART_COOKIE_NAME)
+                        stats.add(
+                            requests=1,
+                            cookie_bytes=len(cookie.OutputString()) if cookie else 0,
+                        )
+                session_cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+                if session_cookie:
+                    session_keys.append(session_cookie.value)
+            finally:
+                connection.close()
+
+        counting_cache = CountingCache(cache, stats)
+        with override_settings(CART_STORAGE=backend), \
+                mock.patch('flowers.cart.cache', counting_cache):
+            threads = [threading.Thread(target=shopper, args=(i,)) for i in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        Session.objects.filter(session_key__in=session_keys).delete()
+        return stats, elapsed
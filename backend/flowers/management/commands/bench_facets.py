@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from flowers.facets import facet_cache_key, get_facets
+from flowers.models import Flower
+from flowers.template_views import CATEGORIES, COLORS, listing_queryset
+
+from .catalog_memory_report import synthetic_flowers
+
+
+class Command(BaseCommand):
+    help = 'Measure uncached facet count latency against FACETS_TIME_BUDGET_MS on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flowers', type=int, default=100000, help='Catalog size to benchmark on')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per filter combination')
+
+    def handle(self, *args, **options):
+        # Synthetic rows are seeded inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            existing = Flower.objects.filter(is_active=True).count()
+            if existing < options['flowers']:
+                self.stdout.write(
+                    f"Seeding {options['flowers'] - existing} synthetic flowers (rolled back afterwards)"
+                )
+                Flower.objects.bulk_create(
+                    synthetic_flowers(options['flowers'] - existing, images_per_flower=0),
+                    batch_size=5000,
+                )
+
+            self.run(options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, repeat):
+        budget = settings.FACETS_TIME_BUDGET_MS
+        combinations = [
+            ('բոլորը', 'բոլորը', ''),
+            (CATEGORIES[1][0], 'բոլորը', ''),
+            ('բոլորը', COLORS[1][0], ''),
+            (CATEGORIES[1][0], COLORS[1][0], ''),
+            ('բոլորը', 'բոլորը', 'Ծաղիկ 1'),
+        ]
+
+        self.stdout.write(f'Budget {budget} ms')
+        self.stdout.write(f"{'category':<14}{'color':<16}{'search':<10}{'p50 ms':>9}{'p99 ms':>9}{'over':>6}")
+        for category, color, search in combinations:
+            timings = []
+            over_budget = 0
+            for _ in range(repeat):
+                # Measure the computation, not the per-version cache in front of it;
+                # only this entry is dropped, the default cache may be shared
+                cache.delete(facet_cache_key(category, color, {'search': search}))
+                start = time.perf_counter()
+                facets = get_facets(listing_queryset(None, None, search), category, color, {'search': search})
+                timings.append((time.perf_counter() - start) * 1000)
+                over_budget += facets is None
+
+            percentiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+            self.stdout.write(
+                f'{category:<14}{color:<16}{search or "-":<10}'
+                f'{percentiles[49]:>9.2f}{percentiles[98]:>9.2f}{over_budget:>6}'
+            )
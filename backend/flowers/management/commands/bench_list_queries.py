@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+
+from flowers.models import Flower, FlowerImage
+from flowers.serializers import FlowerListSerializer
+from flowers.queries import card_queryset
+
+from .catalog_memory_report import DESCRIPTION, synthetic_flowers
+
+
+PER_PAGE = 21
+
+
+def fetched_bytes(queryset):
+    """Approximate bytes the database sends for a queryset (sum of value sizes)"""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(
+            len(value if isinstance(value, bytes) else str(value).encode())
+            for row in cursor.fetchall() for value in row if value is not None
+        )
+
+
+class Command(BaseCommand):
+    help = 'Compare full-row and column-projected listing queries on a long-description catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flowers', type=int, default=2000, help='Synthetic flowers to seed')
+        parser.add_argument('--description-kb', type=int, default=20, help='Description size per flower')
+        parser.add_argument('--repeat', type=int, default=20, help='Pages rendered per variant')
+
+    def handle(self, *args, **options):
+        description = (DESCRIPTION * (options['description_kb'] * 1024 // len(DESCRIPTION.encode()) + 1))
+
+        # Synthetic rows are seeded inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            self.stdout.write(
+                f"Seeding {options['flowers']} flowers with {options['description_kb']} KB descriptions "
+                f"(rolled back afterwards)"
+            )
+            flowers = synthetic_flowers(options['flowers'], images_per_flower=3, description=description)
+            Flower.objects.bulk_create(flowers, batch_size=500)
+            FlowerImage.objects.bulk_create(
+                [image for flower in flowers for image in flower.images.all()], batch_size=2000
+            )
+
+            self.run(options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, repeat):
+        active = Flower.objects.filter(is_active=True)
+        variants = [
+            ('cards, full rows', active.prefetch_related('images'), self.render_cards),
+            ('cards, projected', card_queryset(active), self.render_cards),
+            ('API, full rows', active.prefetch_related('images'), self.serialize),
+            ('API, projected', FlowerListSerializer.setup_queryset(active), self.serialize),
+        ]
+
+        self.stdout.write(f"{'variant':<20}{'flower KB':>11}{'image KB':>10}{'ms/page':>10}")
+        for label, queryset, render in variants:
+            page = queryset[:PER_PAGE]
+            flower_bytes = fetched_bytes(page)
+            ids = [flower.id for flower in page]
+            image_bytes = 0
+            if queryset._prefetch_related_lookups:
+                image_queryset = FlowerImage.objects.filter(flower_id__in=ids)
+                if label.endswith('projected'):
+                    image_queryset = image_queryset.only('id', 'flower_id', 'url', 'is_main')
+                image_bytes = fetched_bytes(image_queryset)
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                render(list(queryset[:PER_PAGE]))
+            page_ms = (time.perf_counter() - start) * 1000 / repeat
+
+            self.stdout.write(
+                f'{label:<20}{flower_bytes / 1024:>11.1f}{image_bytes / 1024:>10.1f}{page_ms:>10.2f}'
+            )
+
+    @staticmethod
+    def render_cards(flowers):
+        for flower in flowers:
+            render_to_string('product_card.html', {'product': flower})
+
+    @staticmethod
+    def serialize(flowers):
+        return FlowerListSerializer(flowers, many=True).data
@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from flowers.models import Flower
+from flowers.pagination import KeysetPaginator, encode_cursor
+
+from .catalog_memory_report import synthetic_flowers
+
+
+PER_PAGE = 21
+
+
+class Command(BaseCommand):
+    help = 'Compare OFFSET and keyset pagination latency from the first page to deep pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per page, the median is reported')
+
+    def handle(self, *args, **options):
+        pages = sorted(options['pages'])
+        needed = pages[-1] * PER_PAGE
+
+        # Synthetic rows are seeded inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            existing = Flower.objects.filter(is_active=True).count()
+            if existing < needed:
+                self.stdout.write(f'Seeding {needed - existing} synthetic flowers (rolled back afterwards)')
+                Flower.objects.bulk_create(
+                    synthetic_flowers(needed - existing, images_per_flower=0), batch_size=5000
+                )
+
+            self.run(pages, options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, pages, repeat):
+        queryset = Flower.objects.filter(is_active=True)
+        ordered = queryset.order_by('-created_at', '-id')
+
+        self.stdout.write(f"{'page':>8}{'offset ms':>12}{'keyset ms':>12}")
+        for number in pages:
+            # The keyset cursor for page N is the last row of page N - 1
+            cursor = None
+            if number > 1:
+                cursor = encode_cursor(ordered[(number - 1) * PER_PAGE - 1], 'next')
+
+            offset_ms = self.median_ms(
+                lambda: list(Paginator(ordered, PER_PAGE).page(number).object_list), repeat
+            )
+            keyset_ms = self.median_ms(
+                lambda: list(KeysetPaginator(queryset, PER_PAGE).get_page(cursor)), repeat
+            )
+            self.stdout.write(f'{number:>8}{offset_ms:>12.2f}{keyset_ms:>12.2f}')
+
+    @staticmethod
+    def median_ms(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from flowers.models import Flower
+from flowers.search import search_flowers
+
+from .catalog_memory_report import synthetic_flowers
+
+
+PER_PAGE = 21
+QUERIES = ['Ծաղիկ 4242', 'վարդ', 'Պրեմիում', 'կարմիր վարդեր', 'անհայտ']
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains and full-text product search latency on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flowers', type=int, default=100000, help='Catalog size to benchmark on')
+        parser.add_argument('--queries', nargs='+', default=QUERIES)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query, the median is reported')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Full-text search needs PostgreSQL')
+
+        # Synthetic rows are seeded inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            existing = Flower.objects.filter(is_active=True).count()
+            if existing < options['flowers']:
+                self.stdout.write(
+                    f"Seeding {options['flowers'] - existing} synthetic flowers (rolled back afterwards)"
+                )
+                Flower.objects.bulk_create(
+                    synthetic_flowers(options['flowers'] - existing, images_per_flower=0),
+                    batch_size=5000,
+                )
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE flowers')
+
+            self.run(options['queries'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, queries, repeat):
+        active = Flower.objects.filter(is_active=True)
+
+        self.stdout.write(
+            f"{'query':<20}{'icontains ms':>14}{'hits':>8}{'fulltext ms':>14}{'hits':>8}"
+        )
+        for query in queries:
+            icontains = active.filter(name__icontains=query)
+            fulltext = search_flowers(active, query)
+
+            # What the listing does per request: count plus the first page
+            icontains_ms = self.median_ms(lambda: (icontains.count(), list(icontains[:PER_PAGE])), repeat)
+            fulltext_ms = self.median_ms(lambda: (fulltext.count(), list(fulltext[:PER_PAGE])), repeat)
+            self.stdout.write(
+                f'{query:<20}{icontains_ms:>14.2f}{icontains.count():>8}'
+                f'{fulltext_ms:>14.2f}{fulltext.count():>8}'
+            )
+
+    @staticmethod
+    def median_ms(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
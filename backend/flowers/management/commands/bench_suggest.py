@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from flowers.models import Flower
+from flowers.suggest import get_suggestion_trie
+
+from .catalog_memory_report import synthetic_flowers
+
+
+class Command(BaseCommand):
+    help = 'Measure p50/p99 latency of the typeahead endpoint under simulated keystrokes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flowers', type=int, default=10000, help='Catalog size to benchmark on')
+        parser.add_argument('--words', type=int, default=200, help='Names typed out keystroke by keystroke')
+        parser.add_argument('--typo-rate', type=float, default=0.1,
+                            help='Share of keystrokes with a typo, which fall through to the trigram index')
+
+    def handle(self, *args, **options):
+        # Synthetic rows are seeded inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            existing = Flower.objects.filter(is_active=True).count()
+            if existing < options['flowers']:
+                self.stdout.write(
+                    f"Seeding {options['flowers'] - existing} synthetic flowers (rolled back afterwards)"
+                )
+                Flower.objects.bulk_create(
+                    synthetic_flowers(options['flowers'] - existing, images_per_flower=0),
+                    batch_size=5000,
+                )
+
+            start = time.perf_counter()
+            trie = get_suggestion_trie()
+            self.stdout.write(
+                f'Trie with {trie.size} entries built in {(time.perf_counter() - start) * 1000:.0f} ms'
+            )
+
+            self.run(self.keystrokes(options['words'], options['typo_rate']))
+            transaction.set_rollback(True)
+
+    def keystrokes(self, words, typo_rate):
+        """Every prefix of randomly picked names, as typed one key at a time"""
+        rng = random.Random(42)
+        names = list(Flower.objects.filter(is_active=True).values_list('name', flat=True)[:5000])
+        queries = []
+        for name in rng.sample(names, min(words, len(names))):
+            for length in range(1, len(name) + 1):
+                query = name[:length]
+                if rng.random() < typo_rate:
+                    query = query[:-1] + 'ք'
+                queries.append(query)
+        return queries
+
+    def run(self, queries):
+        client = Client()
+        url = reverse('suggest')
+        trie = get_suggestion_trie()
+
+        trie_timings = []
+        endpoint_timings = []
+        for query in queries:
+            start = time.perf_counter()
+            trie.search(query)
+            trie_timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            client.get(url, {'q': query})
+            endpoint_timings.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(f"{len(queries)} keystrokes\n{'':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for label, timings in (('trie', trie_timings), ('endpoint', endpoint_timings)):
+            percentiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f'{label:<10}{percentiles[49]:>10.3f}{percentiles[98]:>10.3f}{max(timings):>10.3f}'
+            )
@@ -0,0 +1,79 @@
+import gc
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flowers.catalog import CatalogIndex
+from flowers.models import Flower, FlowerImage
+
+
+CATEGORIES = ['Վարդեր', 'Լիլիաներ', 'Տյուլիպաններ', 'Արևածաղիկներ', 'Խոլորձներ', 'Փունջեր', 'Խառը', 'Պրեմիում']
+COLORS = ['Կարմիր', 'Վարդագույն', 'Սպիտակ', 'Դեղին', 'Մանուշակագույն', 'Բազմագույն']
+DESCRIPTION = 'Շքեղ կարմիր վարդերի փունջ, կատարյալ է յուրաքանչյուր հատուկ առիթի համար։ ' * 4
+
+
+def synthetic_flowers(count, images_per_flower, description=DESCRIPTION):
+    """Unsaved flowers shaped like the ones build_catalog_index loads"""
+    now = timezone.now()
+    flowers = []
+    for i in range(count):
+        flower = Flower(
+            name=f'Ծաղիկ {i}',
+            price_amd=10000 + i % 20000,
+            sale_price_amd=None if i % 5 else 9000,
+            description=description,
+            category=CATEGORIES[i % len(CATEGORIES)],
+            colors=[COLORS[i % len(COLORS)], COLORS[(i * 7) % len(COLORS)]],
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+        )
+        images = [
+            FlowerImage(
+                flower=flower,
+                url=f'https://res.cloudinary.com/demo/image/upload/v1/flowers/{i}-{n}.jpg',
+                is_main=n == 0,
+                created_at=now,
+            )
+            for n in range(images_per_flower)
+        ]
+        # What prefetch_related('images') leaves behind
+        flower._prefetched_objects_cache = {'images': images}
+        flowers.append(flower)
+    return flowers
+
+
+class Command(BaseCommand):
+    help = 'Report the per-worker memory footprint of the in-memory catalog index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--images', type=int, default=3, help='Images per flower')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'flowers':>10}{'total MB':>12}{'index MB':>12}{'bytes/flower':>15}{'build ms':>12}"
+        )
+
+        for size in options['sizes']:
+            gc.collect()
+            tracemalloc.start()
+            flowers = synthetic_flowers(size, options['images'])
+            rows_bytes = tracemalloc.get_traced_memory()[0]
+
+            start = time.perf_counter()
+            index = CatalogIndex(flowers, version=0)
+            build_ms = (time.perf_counter() - start) * 1000
+            total_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{size:>10}"
+                f"{total_bytes / 2 ** 20:>12.1f}"
+                f"{(total_bytes - rows_bytes) / 2 ** 20:>12.1f}"
+                f"{total_bytes / size:>15.0f}"
+                f"{build_ms:>12.0f}"
+            )
+            del flowers, index
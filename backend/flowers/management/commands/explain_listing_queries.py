@@ -0,0 +1,60 @@
+import itertools
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from flowers.template_views import CATEGORIES, COLORS, listing_queryset
+
+
+PER_PAGE = 21
+
+# Index usage as reported by PostgreSQL and SQLite plans
+INDEX_PATTERNS = [
+    re.compile(r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)'),
+    re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+]
+SEQ_SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)$', re.MULTILINE),
+]
+EXECUTION_TIME = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the products listing query for every filter combination and report the indexes used'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', default=CATEGORIES[1][0])
+        parser.add_argument('--color', default=COLORS[1][0])
+        parser.add_argument('--search', default='վարդ')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plans too')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+        else:
+            # ANALYZE/BUFFERS are PostgreSQL only, other backends get a plain plan
+            explain_options = {}
+
+        self.stdout.write(f"{'category':<10}{'color':<8}{'search':<8}{'ms':>9}  indexes")
+        combinations = itertools.product(
+            (None, options['category']), (None, options['color']), (None, options['search'])
+        )
+        for category, color, search in combinations:
+            queryset = listing_queryset(category, color, search or '')[:PER_PAGE]
+            plan = queryset.explain(**explain_options)
+
+            indexes = []
+            for pattern in INDEX_PATTERNS:
+                indexes.extend(pattern.findall(plan))
+            for pattern in SEQ_SCAN_PATTERNS:
+                indexes.extend(f'seq scan on {table}' for table in pattern.findall(plan))
+            timing = EXECUTION_TIME.search(plan)
+
+            self.stdout.write(
+                f"{'yes' if category else '-':<10}{'yes' if color else '-':<8}{'yes' if search else '-':<8}"
+                f"{timing.group(1) if timing else '-':>9}  {', '.join(dict.fromkeys(indexes)) or '?'}"
+            )
+            if options['verbose_plans']:
+                self.stdout.write(plan + '\n')
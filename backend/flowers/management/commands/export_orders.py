@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from flowers.export import EXPORT_FORMATS, export_lines, filter_orders
+from flowers.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Stream orders and their items as CSV or NDJSON, with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--status', choices=[value for value, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='First local day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Last local day (YYYY-MM-DD)')
+        parser.add_argument('--output', '-o', help='File to write, default: stdout')
+        parser.add_argument('--chunk-size', type=int, default=settings.ORDER_EXPORT_CHUNK_SIZE,
+                            help='Orders fetched per round trip of the server-side cursor')
+
+    def handle(self, *args, **options):
+        orders = filter_orders(
+            Order.objects.all(),
+            status=options['status'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+        )
+        lines = export_lines(orders, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                count = self.write(lines, output)
+            self.stderr.write(f"Wrote {count} lines to {options['output']}")
+        else:
+            self.write(lines, self.stdout)
+
+    def write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flowers.utils import deliver_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit instead of polling')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Email outbox worker started')
+
+        while True:
+            processed = deliver_outbox_batch(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts']
+            )
+            if processed:
+                self.stdout.write(f'Processed {processed} email(s)')
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Email outbox drained'))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from flowers.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete checkout idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Keys deleted per statement, keeps each transaction short')
+        parser.add_argument('--ttl-hours', type=int, default=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+    def handle(self, *args, **options):
+        for option in ('batch_size', 'ttl_hours'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+        cutoff = timezone.now() - timedelta(hours=options['ttl_hours'])
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+
+        deleted = 0
+        while True:
+            # Walks the created_at index; each DELETE touches one batch of rows
+            batch = list(expired.order_by('created_at').values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} idempotency key(s) older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from flowers.models import Order
+from flowers.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the daily sales rollup for a date range from the orders. '
+        'Run it once after deploying the rollup, or to repair drift.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='First local day (YYYY-MM-DD), default: the first order')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Last local day (YYYY-MM-DD), default: today')
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+        date_to = options['date_to'] or timezone.localdate()
+        date_from = options['date_from']
+        if date_from is None:
+            first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if first is None:
+                self.stdout.write('No orders, nothing to rebuild')
+                return
+            date_from = timezone.localdate(first)
+        if date_from > date_to:
+            raise CommandError('--from must not be after --to')
+
+        rows = 0
+        chunk_start = date_from
+        while chunk_start <= date_to:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), date_to)
+            rows += rebuild_rollup(chunk_start, chunk_end)
+            self.stdout.write(f'{chunk_start} – {chunk_end}: done')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollup rows for {date_from} – {date_to}'))
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Weighted tsvector kept up to date by PostgreSQL itself, plus its GIN index.
+# The column is deliberately left out of the model state (see flowers/search.py).
+FORWARD_SQL = [
+    "CREATE TEXT SEARCH CONFIGURATION flowers_hy (COPY = simple)",
+    """
+    ALTER TABLE flowers ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('flowers_hy'::regconfig, coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('flowers_hy'::regconfig, coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('flowers_hy'::regconfig, coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX flowers_search_vector_gin ON flowers USING gin (search_vector)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS flowers_search_vector_gin",
+    "ALTER TABLE flowers DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS flowers_hy",
+]
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        # Full-text search only exists on PostgreSQL, other backends keep icontains
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Trigram index behind the fuzzy part of the typeahead (see flowers/suggest.py)
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX flowers_name_trgm ON flowers USING gin (name gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS flowers_name_trgm",
+]
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        # pg_trgm only exists on PostgreSQL, other backends only use the trie
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0007_flower_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+# colors__contains=[...] compiles to jsonb @>, which jsonb_path_ops answers
+# with a smaller and faster GIN index than the default jsonb_ops
+FORWARD_SQL = [
+    "CREATE INDEX flowers_colors_gin ON flowers USING gin (colors jsonb_path_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS flowers_colors_gin",
+]
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        # GIN only exists on PostgreSQL
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0008_flower_name_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flower',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at'], name='flowers_active_cat_created'),
+        ),
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_main_image_url(apps, schema_editor):
+    Flower = apps.get_model('flowers', 'Flower')
+    FlowerImage = apps.get_model('flowers', 'FlowerImage')
+    main_url = FlowerImage.objects.filter(
+        flower=OuterRef('pk'), is_main=True
+    ).order_by('created_at').values('url')[:1]
+    # One UPDATE ... SET main_image_url = (SELECT ...) for the whole table
+    Flower.objects.update(main_image_url=Coalesce(Subquery(main_url), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0009_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flower',
+            name='main_image_url',
+            field=models.URLField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_main_image_url, migrations.RunPython.noop),
+    ]
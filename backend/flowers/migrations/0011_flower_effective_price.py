@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# effective_price_amd = COALESCE(sale_price_amd, price_amd), computed by the
+# database and indexed for the listing's price filters and sorts. It is not
+# part of the model state; queries reach it through flowers.models.effective_price().
+FORWARD_SQL = {
+    'postgresql': [
+        """
+        ALTER TABLE flowers ADD COLUMN effective_price_amd numeric(10, 2)
+            GENERATED ALWAYS AS (COALESCE(sale_price_amd, price_amd)) STORED
+        """,
+        "CREATE INDEX flowers_effective_price_idx ON flowers (effective_price_amd) WHERE is_active",
+    ],
+    # SQLite (local development) can only add virtual generated columns. Note
+    # that SQLite table rebuilds by later migrations drop the column.
+    'sqlite': [
+        """
+        ALTER TABLE flowers ADD COLUMN effective_price_amd decimal
+            GENERATED ALWAYS AS (COALESCE(sale_price_amd, price_amd)) VIRTUAL
+        """,
+        "CREATE INDEX flowers_effective_price_idx ON flowers (effective_price_amd) WHERE is_active",
+    ],
+}
+
+REVERSE_SQL = {
+    'postgresql': [
+        "DROP INDEX IF EXISTS flowers_effective_price_idx",
+        "ALTER TABLE flowers DROP COLUMN IF EXISTS effective_price_amd",
+    ],
+    'sqlite': [
+        "DROP INDEX IF EXISTS flowers_effective_price_idx",
+        "ALTER TABLE flowers DROP COLUMN effective_price_amd",
+    ],
+}
+
+
+def run_for_vendor(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0010_flower_main_image_url'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_for_vendor(FORWARD_SQL), run_for_vendor(REVERSE_SQL)),
+    ]
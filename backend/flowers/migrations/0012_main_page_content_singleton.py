@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:05
+
+from django.db import migrations
+
+SINGLETON_ID = '00000000-0000-0000-0000-000000000001'
+
+
+def create_main_page_content(apps, schema_editor):
+    # Created once here so the home page never has to write
+    MainPageContent = apps.get_model('flowers', 'MainPageContent')
+    MainPageContent.objects.get_or_create(id=SINGLETON_ID)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0011_flower_effective_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_main_page_content, migrations.RunPython.noop),
+    ]
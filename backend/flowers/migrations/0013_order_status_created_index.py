@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0012_main_page_content_singleton'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='orders_status_created'),
+        ),
+    ]
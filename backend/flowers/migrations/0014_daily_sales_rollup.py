@@ -0,0 +1,39 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0013_order_status_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('flower_id', models.UUIDField(blank=True, null=True)),
+                ('flower_name', models.CharField(blank=True, default='', max_length=255)),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('revenue_amd', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'daily_sales_rollup',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'flower_id'), name='sales_rollup_day_status_flower'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('flower_id__isnull', True)), fields=('day', 'status'), name='sales_rollup_day_status_total'),
+        ),
+    ]
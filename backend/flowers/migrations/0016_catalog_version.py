@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:02
+
+import time
+
+from django.db import migrations, models
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('flowers', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1, defaults={'version': time.time_ns()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flowers', '0015_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'catalog_version',
+            },
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
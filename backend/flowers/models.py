@@ -2,6 +2,20 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+
+def effective_price():
+    """
+    The flowers.effective_price_amd generated column, COALESCE(sale_price_amd,
+    price_amd), for annotate(effective_price_amd=effective_price()).
+    Filtering and ordering on it use its index (migration 0011).
+    """
+    return RawSQL(
+        '"flowers"."effective_price_amd"', (),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
 
 
 class Flower(models.Model):
@@ -29,6 +43,8 @@ class Flower(models.Model):
     colors = models.JSONField(default=list)  # Array of color strings
     is_free_delivery = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Copy of the main FlowerImage url, kept in sync by FlowerImage.save/delete
+    main_image_url = models.URLField(max_length=500, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -39,6 +55,12 @@ class Flower(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
             models.Index(fields=['-created_at']),
+            # The listing filters active flowers by category, newest first
+            models.Index(
+                fields=['category', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='flowers_active_cat_created',
+            ),
         ]
 
     def __str__(self):
@@ -47,8 +69,17 @@ class Flower(models.Model):
     @property
     def main_image(self):
         """Get the main image for this flower"""
-        main_img = self.images.filter(is_main=True).first()
-        return main_img.url if main_img else None
+        return self.main_image_url or None
+
+    @property
+    def card_description(self):
+        """
+        Description shown on cards: the description_head excerpt when the
+        row was loaded without the full description (see card_queryset)
+        """
+        if 'description_head' in self.__dict__:
+            return self.description_head
+        return self.description
 
 
 class FlowerImage(models.Model):
@@ -85,8 +116,39 @@ class FlowerImage(models.Model):
             ).exclude(id=self.id).update(is_main=False)
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def sync_main_image_url(flower_id):
+        """
+        Copy the current main image url onto the flower.
+        Runs from the FlowerImage post_save/post_delete signals (flowers/signals.py);
+        call it after bulk image changes that bypass them.
+        """
+        url = FlowerImage.objects.filter(
+            flower_id=flower_id, is_main=True
+        ).values_list('url', flat=True).first() or ''
+        # updated_at moves with it, so caches keyed on it see the new image
+        Flower.objects.filter(id=flower_id).exclude(main_image_url=url).update(
+            main_image_url=url, updated_at=timezone.now()
+        )
+
+
+class CatalogVersion(models.Model):
+    """Single row holding the catalog version shared by all workers (flowers/catalog.py)"""
+    SINGLETON_ID = 1
+
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'catalog_version'
+
+    def __str__(self):
+        return str(self.version)
+
 
 class MainPageContent(models.Model):
+    # The site has a single row, created by migration 0012
+    SINGLETON_ID = '00000000-0000-0000-0000-000000000001'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     title = models.CharField(max_length=255, default="Բնական գեղեցկություն")
@@ -165,6 +227,8 @@ class Order(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['customer_phone']),
             models.Index(fields=['-created_at']),
+            # Dashboard status filter walked in keyset order
+            models.Index(fields=['status', '-created_at', '-id'], name='orders_status_created'),
         ]
     
     def __str__(self):
@@ -212,3 +276,124 @@ class OrderItem(models.Model):
         return self.price_amd_at_purchase * self.quantity
 
 
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued inside the request and delivered by the
+    process_email_outbox worker
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='emails'
+    )
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Email to {self.to} - {self.status}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Sales figures per local day and order status, kept up to date by
+    flowers/rollup.py when orders are placed or change status.
+
+    The row with flower_id NULL holds the day's totals for the status; the
+    others hold one flower each (order_count is the orders containing it).
+    flower_id is a plain UUID rather than a foreign key so the history
+    survives deleted flowers.
+    """
+    # Bucket for items whose flower was deleted before a rebuild
+    UNKNOWN_FLOWER_ID = uuid.UUID(int=0)
+
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    flower_id = models.UUIDField(null=True, blank=True)
+    flower_name = models.CharField(max_length=255, blank=True, default='')
+    category = models.CharField(max_length=100, blank=True, default='')
+
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    revenue_amd = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day']
+        db_table = 'daily_sales_rollup'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'flower_id'],
+                name='sales_rollup_day_status_flower',
+            ),
+            # NULLs are distinct in the constraint above, so the totals row needs its own
+            models.UniqueConstraint(
+                fields=['day', 'status'],
+                condition=models.Q(flower_id__isnull=True),
+                name='sales_rollup_day_status_total',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.flower_name or 'total'}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Client-supplied key of an order placement (checkout form field or
+    Idempotency-Key header), so a retried submission gets the order it
+    already created instead of a duplicate. Keys are unique per scope (the
+    client that sent them) and remember a hash of the order request, so a
+    reused key cannot return another client's order or a different one.
+    Purged after IDEMPOTENCY_KEY_TTL_HOURS by the purge_idempotency_keys
+    command.
+    """
+    scope = models.CharField(max_length=80, blank=True, default='')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_key_per_scope'),
+        ]
+
+    def __str__(self):
+        return self.key
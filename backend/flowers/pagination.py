@@ -1,20 +1,274 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
-import math
+from rest_framework.utils.urls import replace_query_param
+
+from .catalog import get_catalog_version
+
+
+# ==================== COUNTING ====================
+def estimate_count(queryset):
+    """Planner row estimate for a queryset (PostgreSQL only, None elsewhere)"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountingPaginator(Paginator):
+    """
+    Paginator with a choice of how querysets are counted
+    (settings.PAGINATION_COUNT_MODE unless given):
+
+    - 'exact': a COUNT(*) on every page, like Django's Paginator
+    - 'estimate': the planner's row estimate from EXPLAIN, falling back to
+      an exact count when the estimate is under COUNT_ESTIMATE_THRESHOLD
+    - 'cached': the exact count, cached per query (the compiled SQL and
+      params, so equal filters share an entry) and catalog version
+
+    Sequences (e.g. from the catalog index) are always counted with len().
+    """
+
+    def __init__(self, object_list, per_page, count_mode=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_mode = count_mode or settings.PAGINATION_COUNT_MODE
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or self.count_mode == 'exact':
+            return super().count
+
+        if self.count_mode == 'estimate':
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+                self.count_is_estimate = True
+                return estimate
+            return super().count
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(f'{sql}\x1f{params!r}'.encode()).hexdigest()
+        key = f'count:{get_catalog_version()}:{digest}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+        return count
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 21
     page_size_query_param = 'page_size'
+    max_page_size = 100
+    django_paginator_class = CountingPaginator
 
     def get_paginated_response(self, data):
-        total_pages = math.ceil(self.page.paginator.count / self.page_size)
+        paginator = self.page.paginator
 
         return Response({
-            'count': self.page.paginator.count,
-            'total_pages': total_pages,
+            'count': paginator.count,
+            'count_is_estimate': paginator.count_is_estimate,
+            'total_pages': paginator.num_pages,
             'current_page': self.page.number,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'results': data,
         })
-    
\ No newline at end of file
+
+
+# ==================== KEYSET (CURSOR) PAGINATION ====================
+class InvalidCursor(ValueError):
+    """Raised for cursor tokens that cannot be decoded"""
+
+
+def encode_cursor(row, direction):
+    """Opaque token pointing just past `row` in the given direction ('next' or 'prev')"""
+    payload = json.dumps([row.created_at.isoformat(), str(row.id), direction])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, id, direction) for a token made by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        created_at = datetime.fromisoformat(created_at)
+        # encode_cursor only writes aware timestamps; naive ones cannot be compared
+        if created_at.tzinfo is None:
+            raise ValueError(created_at)
+        return created_at, uuid.UUID(str(pk)), direction
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(token) from e
+
+
+class KeysetPage:
+    """One page of a keyset pagination, with opaque next/previous tokens"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Keyset pagination over rows (flowers, orders) ordered by (-created_at, -id).
+
+    Each page is located by the (created_at, id) of the row it continues
+    from instead of an OFFSET, so page 10,000 costs the same as page 1 and
+    no COUNT is needed. Works with querysets (served by the -created_at
+    index) and with sequences already sorted the same way, such as the
+    in-memory catalog index.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        """Return the page for a cursor token; None or an invalid token gives the first page"""
+        try:
+            position = decode_cursor(cursor) if cursor else None
+        except InvalidCursor:
+            position = None
+
+        if position is None:
+            rows, has_more = self._slice(None, 'next')
+            direction = 'next'
+        else:
+            created_at, pk, direction = position
+            rows, has_more = self._slice((created_at, str(pk)), direction)
+
+        if direction == 'next':
+            has_next, has_previous = has_more, position is not None
+        else:
+            has_next, has_previous = position is not None, has_more
+
+        next_cursor = encode_cursor(rows[-1], 'next') if rows and has_next else None
+        previous_cursor = encode_cursor(rows[0], 'prev') if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def _slice(self, key, direction):
+        """Fetch per_page rows after (or before) key, plus whether more rows exist"""
+        if hasattr(self.object_list, 'filter'):
+            rows = self._slice_queryset(key, direction)
+        else:
+            rows = self._slice_sequence(key, direction)
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+        return rows, has_more
+
+    def _slice_queryset(self, key, direction):
+        queryset = self.object_list
+        if direction == 'next':
+            if key:
+                created_at, pk = key
+                # created_at <= X keeps the range scan on the created_at index
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at)
+                    & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+                )
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            created_at, pk = key
+            queryset = queryset.filter(
+                Q(created_at__gte=created_at)
+                & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+            ).order_by('created_at', 'id')
+        return list(queryset[:self.per_page + 1])
+
+    def _slice_sequence(self, key, direction):
+        rows = self.object_list
+        if key is None:
+            return list(rows[:self.per_page + 1])
+
+        # Binary search for the first row strictly after key in (-created_at, -id) order
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            flower = rows[middle]
+            if (flower.created_at, str(flower.id)) > key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if direction == 'next':
+            start = low + 1 if low < len(rows) and self._key(rows[low]) == key else low
+            return list(rows[start:start + self.per_page + 1])
+        return list(reversed(rows[max(low - self.per_page - 1, 0):low]))
+
+    @staticmethod
+    def _key(flower):
+        return (flower.created_at, str(flower.id))
+
+
+class KeysetResultsSetPagination(BasePagination):
+    """REST pagination using keyset cursors instead of page numbers"""
+    page_size = 21
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = KeysetPaginator(queryset, self.get_page_size(request)).get_page(
+            request.query_params.get(self.cursor_query_param)
+        )
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        })
@@ -0,0 +1,26 @@
+"""
+Querysets shared by the views and the cached home page.
+"""
+
+from django.db.models.functions import Substr
+
+# Columns product cards are rendered from (plus created_at for keyset
+# pagination and updated_at for the card cache key)
+CARD_FIELDS = (
+    'id', 'name', 'price_amd', 'sale_price_amd', 'category', 'is_free_delivery',
+    'main_image_url', 'created_at', 'updated_at',
+)
+
+# Cards show the first 15 words of the description
+CARD_DESCRIPTION_CHARS = 200
+
+
+def card_queryset(flowers):
+    """
+    Load only what product_card.html and pagination need: no image join
+    (cards use main_image_url) and a short description excerpt instead of
+    the unbounded description column
+    """
+    return flowers.only(*CARD_FIELDS).annotate(
+        description_head=Substr('description', 1, CARD_DESCRIPTION_CHARS)
+    )
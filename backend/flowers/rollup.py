@@ -0,0 +1,235 @@
+"""
+Incrementally maintained daily sales rollup.
+
+DailySalesRollup holds order/item counts and revenue per local day, order
+status and flower (plus a per day and status totals row). Placing an
+order adds it under 'pending'; a status change moves its figures from the
+old status to the new one. Each change is two upserts adding the deltas
+to the existing rows, in the caller's transaction, so reports read O(days)
+rollup rows instead of scanning orders and order_items.
+
+rebuild_rollup() recomputes a date range from the orders, for the first
+deployment and to repair drift (the rebuild_sales_rollup command).
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order, OrderItem
+
+# Statuses whose orders count towards revenue in the reports
+REVENUE_STATUSES = [value for value, _ in Order.STATUS_CHOICES if value != 'cancelled']
+
+
+# ==================== INCREMENTAL UPDATES ====================
+ROLLUP_COLUMNS = (
+    'day', 'status', 'flower_id', 'flower_name', 'category',
+    'order_count', 'item_count', 'revenue_amd',
+)
+ROW_PLACEHOLDERS = '(' + ', '.join(['%s'] * len(ROLLUP_COLUMNS)) + ')'
+
+# Conflict targets of the two unique constraints on DailySalesRollup
+TOTALS_TARGET = '(day, status) WHERE flower_id IS NULL'
+FLOWERS_TARGET = '(day, status, flower_id)'
+
+# Supported by PostgreSQL and SQLite >= 3.24 alike
+UPSERT_SQL = f"""
+    INSERT INTO daily_sales_rollup ({', '.join(ROLLUP_COLUMNS)})
+    VALUES {{values}}
+    ON CONFLICT {{target}} DO UPDATE SET
+        flower_name = excluded.flower_name,
+        category = excluded.category,
+        order_count = daily_sales_rollup.order_count + excluded.order_count,
+        item_count = daily_sales_rollup.item_count + excluded.item_count,
+        revenue_amd = daily_sales_rollup.revenue_amd + excluded.revenue_amd
+"""
+
+
+class RollupDeltas:
+    """Changes to rollup rows, merged per (day, status, flower_id) before writing"""
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: {
+            'flower_name': '', 'category': '',
+            'order_count': 0, 'item_count': 0, 'revenue_amd': Decimal('0'),
+        })
+
+    def add_order(self, order, status, lines, sign):
+        """
+        Add (sign=1) or remove (sign=-1) one order under `status`.
+        `lines` are (flower_id, flower_name, category, quantity, price) tuples.
+        """
+        day = timezone.localdate(order.created_at)
+        total = self.rows[(day, status, None)]
+        total['order_count'] += sign
+        for flower_id, flower_name, category, quantity, price in lines:
+            row = self.rows[(day, status, flower_id or DailySalesRollup.UNKNOWN_FLOWER_ID)]
+            # Items of deleted flowers share one unnamed row, as in rebuild_rollup
+            row['flower_name'] = flower_name if flower_id else ''
+            row['category'] = category or ''
+            row['order_count'] += sign
+            row['item_count'] += sign * quantity
+            row['revenue_amd'] += sign * price * quantity
+            total['item_count'] += sign * quantity
+            total['revenue_amd'] += sign * price * quantity
+
+    def save(self):
+        """
+        Apply the deltas with two INSERT ... ON CONFLICT DO UPDATE statements
+        (totals rows and flower rows), whatever the number of rows
+        """
+        totals = [key for key in self.rows if key[2] is None]
+        flowers = [key for key in self.rows if key[2] is not None]
+        with connection.cursor() as cursor:
+            for keys, target in ((totals, TOTALS_TARGET), (flowers, FLOWERS_TARGET)):
+                if keys:
+                    params = [param for key in keys for param in self._row_params(key)]
+                    values = ', '.join([ROW_PLACEHOLDERS] * len(keys))
+                    cursor.execute(UPSERT_SQL.format(values=values, target=target), params)
+
+    def _row_params(self, key):
+        day, status, flower_id = key
+        values = dict(self.rows[key], day=day, status=status, flower_id=flower_id)
+        return [
+            DailySalesRollup._meta.get_field(column).get_db_prep_save(values[column], connection)
+            for column in ROLLUP_COLUMNS
+        ]
+
+
+def record_order_placed(order, items):
+    """Add a new order and its (unsaved or saved) OrderItems to the rollup"""
+    deltas = RollupDeltas()
+    deltas.add_order(order, order.status, [
+        (item.flower_id, item.flower_name, item.flower.category if item.flower else '',
+         item.quantity, item.price_amd_at_purchase)
+        for item in items
+    ], 1)
+    deltas.save()
+
+
+def record_status_changes(changes):
+    """
+    Move orders between statuses in the rollup.
+    `changes` is a list of (order, old_status, new_status); the items of
+    all the orders are read in one query.
+    """
+    changes = [change for change in changes if change[1] != change[2]]
+    if not changes:
+        return
+
+    lines = defaultdict(list)
+    items = OrderItem.objects.filter(order_id__in=[order.pk for order, _, _ in changes]).values_list(
+        'order_id', 'flower_id', 'flower_name', 'flower__category', 'quantity', 'price_amd_at_purchase'
+    )
+    for order_id, *line in items:
+        lines[order_id].append(line)
+
+    deltas = RollupDeltas()
+    for order, old_status, new_status in changes:
+        deltas.add_order(order, old_status, lines[order.pk], -1)
+        deltas.add_order(order, new_status, lines[order.pk], 1)
+    deltas.save()
+
+
+# ==================== REBUILD ====================
+def day_start(day):
+    """Aware start of a local day, so date filters stay range scans on created_at"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def rebuild_rollup(date_from, date_to):
+    """
+    Recompute the rollup rows of local days date_from..date_to (inclusive)
+    from the orders. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        lock_rollup(date_from, date_to)
+        rows = compute_rollup_rows(date_from, date_to)
+        DailySalesRollup.objects.filter(day__gte=date_from, day__lte=date_to).delete()
+        DailySalesRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def lock_rollup(date_from, date_to):
+    """
+    Keep concurrent order writes from updating the range while it is
+    recomputed; they wait for the rebuild and then add their deltas to it
+    """
+    if connection.vendor == 'postgresql':
+        # Row locks would miss rows inserted for a new day/status/flower
+        with connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE daily_sales_rollup IN SHARE ROW EXCLUSIVE MODE')
+    else:
+        list(DailySalesRollup.objects.select_for_update().filter(
+            day__gte=date_from, day__lte=date_to
+        ).values_list('pk', flat=True))
+
+
+def compute_rollup_rows(date_from, date_to):
+    """Unsaved DailySalesRollup rows of the range, aggregated from the order items"""
+    items = OrderItem.objects.filter(
+        order__created_at__gte=day_start(date_from),
+        order__created_at__lt=day_start(date_to + timedelta(days=1)),
+    ).annotate(day=TruncDate('order__created_at'), status=F('order__status'))
+    figures = dict(
+        item_count=Sum('quantity'),
+        revenue_amd=Sum(F('price_amd_at_purchase') * F('quantity')),
+    )
+
+    rows = [
+        DailySalesRollup(
+            day=row['day'], status=row['status'], flower_id=None,
+            order_count=row['order_count'], item_count=row['item_count'], revenue_amd=row['revenue_amd'],
+        )
+        for row in items.values('day', 'status').annotate(
+            order_count=Count('order_id', distinct=True), **figures
+        ).order_by()
+    ]
+    rows += [
+        DailySalesRollup(
+            day=row['day'], status=row['status'],
+            flower_id=row['flower_id'] or DailySalesRollup.UNKNOWN_FLOWER_ID,
+            flower_name=row['name'] if row['flower_id'] else '', category=row['category'] or '',
+            order_count=row['order_count'], item_count=row['item_count'], revenue_amd=row['revenue_amd'],
+        )
+        for row in items.values('day', 'status', 'flower_id').annotate(
+            order_count=Count('order_id', distinct=True),
+            name=Max('flower_name'), category=Max('flower__category'),
+            **figures
+        ).order_by()
+    ]
+    return rows
+
+
+# ==================== REPORTS ====================
+def sales_stats(date_from, date_to, top=10):
+    """
+    Dashboard figures for local days date_from..date_to, read only from the
+    rollup: totals per status, revenue per day and the top flowers and
+    categories (cancelled orders excluded from the last three).
+    """
+    rows = DailySalesRollup.objects.filter(day__gte=date_from, day__lte=date_to)
+    totals = rows.filter(flower_id__isnull=True)
+    flowers = rows.filter(flower_id__isnull=False, status__in=REVENUE_STATUSES)
+    figures = dict(orders=Sum('order_count'), items=Sum('item_count'), revenue=Sum('revenue_amd'))
+
+    return {
+        'from': date_from,
+        'to': date_to,
+        'by_status': list(totals.values('status').annotate(**figures).order_by('status')),
+        'daily': list(
+            totals.filter(status__in=REVENUE_STATUSES).values('day').annotate(**figures).order_by('day')
+        ),
+        'top_flowers': list(
+            flowers.values('flower_id').annotate(name=Max('flower_name'), **figures).order_by('-revenue')[:top]
+        ),
+        'categories': list(
+            flowers.values('category').annotate(**figures).order_by('-revenue')
+        ),
+    }
@@ -0,0 +1,46 @@
+"""
+Full-text search over the catalog.
+
+flowers.search_vector is a stored generated tsvector column over name
+(weight A), category (B) and description (C), built with the flowers_hy
+text search configuration and indexed with GIN (see migration 0007).
+PostgreSQL ships no Armenian stemmer, so flowers_hy is a copy of 'simple':
+it lowercases and keeps every word. Armenian inflects with suffixes, so
+each search term is matched as a prefix (վարդ matches վարդեր, վարդերի).
+
+The column is not part of the model state, so regular Flower queries never
+load it; it is only referenced through the expressions below.
+"""
+
+import re
+
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'flowers_hy'
+
+TERM_RE = re.compile(r'[^\W_]+')
+
+
+def build_prefix_query(text):
+    """Turn free text into a to_tsquery expression matching every term as a prefix"""
+    terms = TERM_RE.findall(text.lower())
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def search_flowers(queryset, text):
+    """
+    Filter a Flower queryset to full-text matches, best ranked first.
+    Uses the GIN index on search_vector, so latency does not grow with the
+    catalog the way a name__icontains scan does.
+    """
+    tsquery = build_prefix_query(text)
+    if not tsquery:
+        return queryset
+
+    params = (SEARCH_CONFIG, tsquery)
+    return queryset.filter(
+        RawSQL('flowers.search_vector @@ to_tsquery(%s::regconfig, %s)', params, output_field=BooleanField())
+    ).annotate(
+        search_rank=RawSQL('ts_rank(flowers.search_vector, to_tsquery(%s::regconfig, %s))', params, output_field=FloatField())
+    ).order_by('-search_rank', '-created_at')
@@ -339,7 +339,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.db.models import Prefetch
+from django.db.models.functions import Substr
 from .models import Flower, FlowerImage, Order, OrderItem, MainPageContent
+from .services import (
+    OrderPlacementError, OrderStatusError, change_order_status, idempotency_scope, place_order_once,
+)
 
 
 # ==================== IMAGE SERIALIZERS ====================
@@ -353,24 +358,42 @@ class FlowerImageSerializer(serializers.ModelSerializer):
     
     def get_url(self, obj):
         """Get absolute URL for image"""
-        if obj.image:
-            return obj.image.url
-        return None
+        return obj.url or None
 
 
 # ==================== FLOWER SERIALIZERS ====================
 class FlowerListSerializer(serializers.ModelSerializer):
-    """Serializer for flower list view"""
+    """
+    Serializer for flower list view.
+    Lists carry a description excerpt and no timestamps; use
+    setup_queryset() so only those columns are loaded.
+    """
     images = FlowerImageSerializer(many=True, read_only=True)
+    description = serializers.CharField(source='card_description', read_only=True)
+    
+    # Columns the list representation reads
+    LIST_FIELDS = (
+        'id', 'name', 'price_amd', 'sale_price_amd', 'category', 'colors',
+        'main_image_url', 'is_free_delivery', 'is_active', 'to_be_on_main_page',
+    )
+    DESCRIPTION_CHARS = 200
     
     class Meta:
         model = Flower
         fields = [
             'id', 'name', 'price_amd', 'sale_price_amd',
-            'description', 'category', 'colors', 'images',
+            'description', 'category', 'colors', 'images', 'main_image_url',
             'is_free_delivery', 'is_active', 'to_be_on_main_page',
-            'created_at', 'updated_at'
         ]
+    
+    @classmethod
+    def setup_queryset(cls, queryset):
+        """Project a Flower queryset to the list columns and prefetch slim images"""
+        return queryset.only(*cls.LIST_FIELDS).annotate(
+            description_head=Substr('description', 1, cls.DESCRIPTION_CHARS)
+        ).prefetch_related(
+            Prefetch('images', queryset=FlowerImage.objects.only('id', 'flower_id', 'url', 'is_main'))
+        )
 
 
 class FlowerDetailSerializer(serializers.ModelSerializer):
@@ -456,7 +479,7 @@ class FlowerCreateUpdateSerializer(serializers.ModelSerializer):
         for img_data in images_data:
             FlowerImage.objects.create(
                 flower=flower,
-                image=img_data.get('url'),
+                url=img_data.get('url'),
                 is_main=img_data.get('is_main', False)
             )
         
@@ -486,9 +509,12 @@ class FlowerCreateUpdateSerializer(serializers.ModelSerializer):
             for img_data in images_data:
                 FlowerImage.objects.create(
                     flower=instance,
-                    image=img_data.get('url'),
+                    url=img_data.get('url'),
                     is_main=img_data.get('is_main', False)
                 )
+            
+            # The image signals copied the new main image url onto the flower
+            instance.refresh_from_db(fields=['main_image_url', 'updated_at'])
         
         return instance
 
@@ -562,7 +588,10 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Allow updating order status"""
         if 'status' in validated_data:
-            instance.status = validated_data['status']
+            try:
+                return change_order_status(instance.pk, validated_data['status'])
+            except OrderStatusError as e:
+                raise serializers.ValidationError({'status': str(e)})
         instance.save()
         return instance
 
@@ -581,6 +610,8 @@ class OrderCreateSerializer(serializers.Serializer):
         child=serializers.DictField(),
         min_length=1
     )
+    # Alternatively sent as the Idempotency-Key header
+    idempotency_key = serializers.CharField(required=False, write_only=True, max_length=255)
     
     def validate_items(self, value):
         """Validate order items"""
@@ -594,56 +625,30 @@ class OrderCreateSerializer(serializers.Serializer):
     def create(self, validated_data):
         """Create order with items"""
         items_data = validated_data.pop('items')
+        idempotency_key = validated_data.pop('idempotency_key', None)
+        request = self.context.get('request')
+        if not idempotency_key and request is not None:
+            idempotency_key = request.headers.get('Idempotency-Key')
         
-        # Calculate total
-        total_amount = 0
-        order_items_to_create = []
-        
-        for item_data in items_data:
-            try:
-                flower = Flower.objects.get(id=item_data['flower_id'], is_active=True)
-            except Flower.DoesNotExist:
-                raise serializers.ValidationError(
-                    f"Flower with ID {item_data['flower_id']} not found or inactive"
-                )
-            
-            # Use sale price if available
-            price = flower.sale_price_amd if flower.sale_price_amd else flower.price_amd
-            quantity = item_data['quantity']
-            subtotal = price * quantity
-            total_amount += subtotal
-            
-            # Get main image
-            main_image = flower.images.filter(is_main=True).first()
-            image_url = main_image.image.url if main_image else None
-            
-            order_items_to_create.append({
-                'flower': flower,
-                'flower_name': flower.name,
-                'flower_image_url': image_url,
-                'price_amd_at_purchase': price,
-                'quantity': quantity
-            })
-        
-        # Create order
-        order = Order.objects.create(
-            customer_name=validated_data['customer_name'],
-            customer_email=validated_data.get('customer_email', ''),
-            customer_phone=validated_data['customer_phone'],
-            delivery_city=validated_data['delivery_city'],
-            delivery_address=validated_data['delivery_address'],
-            delivery_notes=validated_data.get('delivery_notes', ''),
-            bacik_erktox=validated_data.get('bacik_erktox', ''),
-            payment_method=validated_data['payment_method'],
-            total_amount_amd=total_amount,
-            status='pending'
-        )
-        
-        # Create order items
-        for item_data in order_items_to_create:
-            OrderItem.objects.create(order=order, **item_data)
-        
-        return order
+        try:
+            order, _ = place_order_once(
+                idempotency_key,
+                {
+                    'customer_name': validated_data['customer_name'],
+                    'customer_email': validated_data.get('customer_email', ''),
+                    'customer_phone': validated_data['customer_phone'],
+                    'delivery_city': validated_data['delivery_city'],
+                    'delivery_address': validated_data['delivery_address'],
+                    'delivery_notes': validated_data.get('delivery_notes', ''),
+                    'bacik_erktox': validated_data.get('bacik_erktox', ''),
+                    'payment_method': validated_data['payment_method'],
+                },
+                items_data,
+                scope=idempotency_scope(request),
+            )
+            return order
+        except OrderPlacementError as e:
+            raise serializers.ValidationError(str(e))
 
 
 # ==================== AUTHENTICATION SERIALIZER ====================
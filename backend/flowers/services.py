@@ -0,0 +1,263 @@
+"""
+Domain services shared by the template views and the REST serializers.
+"""
+
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Flower, IdempotencyKey, Order, OrderItem, effective_price
+from .rollup import record_order_placed, record_status_changes
+
+
+class OrderPlacementError(Exception):
+    """Raised when an order cannot be placed, e.g. a flower is gone or inactive"""
+
+
+class OrderStatusError(Exception):
+    """Raised for a status change the order's current status does not allow"""
+
+
+# Statuses an order may move to from each status; delivered and cancelled are final
+ORDER_TRANSITIONS = {
+    'pending': {'confirmed', 'processing', 'delivered', 'cancelled'},
+    'confirmed': {'pending', 'processing', 'delivered', 'cancelled'},
+    'processing': {'pending', 'confirmed', 'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+
+def statuses_leading_to(new_status):
+    """Current statuses from which an order may move to new_status"""
+    return [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+
+
+def place_order(order_data, items):
+    """
+    Create an order with its items.
+
+    `order_data` holds the Order customer/delivery/payment fields and
+    `items` is a list of {'flower_id': ..., 'quantity': ...}. Prices are
+    always taken from the database, never from the client.
+
+    Everything runs in one transaction with a fixed number of queries
+    whatever the basket size: one in_bulk for the flowers, one INSERT for
+    the order and one bulk INSERT for the items, plus the two sales rollup
+    upserts (daily totals and per flower rows).
+    """
+    quantities = {}
+    for item in items:
+        quantity = int(item['quantity'])
+        if quantity < 1:
+            raise OrderPlacementError('Each item must have a valid quantity')
+        try:
+            flower_id = str(uuid.UUID(str(item['flower_id'])))
+        except ValueError:
+            raise OrderPlacementError(f"Flower with ID {item['flower_id']} not found or inactive")
+        quantities[flower_id] = quantities.get(flower_id, 0) + quantity
+
+    if not quantities:
+        raise OrderPlacementError('Order must contain at least one item')
+
+    with transaction.atomic():
+        flowers = Flower.objects.filter(is_active=True).annotate(
+            effective_price_amd=effective_price()
+        ).in_bulk(list(quantities))
+        flowers = {str(pk): flower for pk, flower in flowers.items()}
+
+        total_amount = Decimal('0')
+        order_items = []
+        for flower_id, quantity in quantities.items():
+            flower = flowers.get(flower_id)
+            if flower is None:
+                raise OrderPlacementError(f"Flower with ID {flower_id} not found or inactive")
+
+            # Sale price if set, computed by the database
+            price = flower.effective_price_amd
+            total_amount += price * quantity
+            order_items.append(OrderItem(
+                flower=flower,
+                flower_name=flower.name,
+                flower_image_url=flower.main_image_url or None,
+                price_amd_at_purchase=price,
+                quantity=quantity,
+            ))
+
+        order = Order.objects.create(
+            total_amount_amd=total_amount,
+            status='pending',
+            **order_data
+        )
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+        record_order_placed(order, order_items)
+
+    return order
+
+
+def idempotency_scope(request):
+    """
+    The client idempotency keys are unique for: the signed-in user, else the
+    browser's CSRF cookie (hashed). '' for clients sending neither, such as
+    anonymous API calls; their keys still only return an order for the
+    same request.
+    """
+    if request is None:
+        return ''
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    client = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if client:
+        return 'client:' + hashlib.sha256(client.encode()).hexdigest()
+    return ''
+
+
+def order_request_hash(order_data, items):
+    """Digest of an order request, to tell a retry from a different order sent with the same key"""
+    payload = {
+        'order': order_data,
+        'items': sorted([str(item['flower_id']), str(item['quantity'])] for item in items),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def find_idempotency_key(scope, key):
+    """The IdempotencyKey row of a client's key with its order, or None (one unique index lookup)"""
+    return IdempotencyKey.objects.select_related('order').filter(scope=scope, key=key).first()
+
+
+def find_idempotent_order(scope, key):
+    """The order a client already placed with an idempotency key, or None"""
+    record = find_idempotency_key(scope, key)
+    return record.order if record else None
+
+
+def replayed_order(record, request_hash):
+    if record.request_hash != request_hash:
+        raise OrderPlacementError('This idempotency key was already used for a different order')
+    return record.order
+
+
+def place_order_once(idempotency_key, order_data, items, on_placed=None, scope=''):
+    """
+    place_order guarded by a client idempotency key. Returns (order, created).
+
+    A key the client (`scope`, see idempotency_scope) used before returns
+    its order without placing anything, provided the request is the same;
+    a different order under that key raises OrderPlacementError. The key
+    row is inserted before the order in the same transaction, so a
+    concurrent request with the same key waits on the unique index and then
+    gets the winner's order. `on_placed(order)` runs inside the transaction,
+    for side effects such as queueing the confirmation email only once.
+    Without a key this is a plain place_order.
+    """
+    if not idempotency_key:
+        with transaction.atomic():
+            order = place_order(order_data, items)
+            if on_placed:
+                on_placed(order)
+        return order, True
+
+    if len(idempotency_key) > IdempotencyKey._meta.get_field('key').max_length:
+        raise OrderPlacementError('Invalid idempotency key')
+
+    request_hash = order_request_hash(order_data, items)
+    record = find_idempotency_key(scope, idempotency_key)
+    if record is not None:
+        return replayed_order(record, request_hash), False
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(scope=scope, key=idempotency_key, request_hash=request_hash)
+            order = place_order(order_data, items)
+            if on_placed:
+                on_placed(order)
+            record.order = order
+            record.save(update_fields=['order'])
+    except IntegrityError:
+        # A concurrent request with the same key committed first
+        record = find_idempotency_key(scope, idempotency_key)
+        if record is None:
+            raise
+        return replayed_order(record, request_hash), False
+    return order, True
+
+
+def change_order_status(order_id, new_status):
+    """
+    Set an order's status and move its figures to the new status in the
+    sales rollup. The order row is locked so concurrent changes of the same
+    order are applied one after the other. Returns the order; raises
+    OrderStatusError when ORDER_TRANSITIONS does not allow the change.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order_id)
+        old_status = order.status
+        if old_status == new_status:
+            return order
+        if new_status not in ORDER_TRANSITIONS.get(old_status, ()):
+            raise OrderStatusError(f'Order {order_id} cannot move from {old_status} to {new_status}')
+
+        order.status = new_status
+        order.save(update_fields=['status', 'updated_at'])
+        record_status_changes([(order, old_status, new_status)])
+    return order
+
+
+def bulk_change_order_status(order_ids, new_status):
+    """
+    Move many orders to new_status with one conditional
+    UPDATE ... SET status, updated_at WHERE id IN (...) AND status IN (...).
+
+    The orders are locked first (SELECT ... FOR UPDATE of id, status and
+    created_at only) to report a result per order and move their figures in
+    the sales rollup. Returns {order_id: result}, where result is one of
+    'updated', 'unchanged' (already in new_status), 'not_allowed' and
+    'not_found'.
+    """
+    if new_status not in ORDER_TRANSITIONS:
+        raise OrderStatusError(f'Unknown status {new_status}')
+
+    keys, valid_ids = [], []
+    for order_id in order_ids:
+        try:
+            order_id = uuid.UUID(str(order_id))
+            valid_ids.append(order_id)
+        except ValueError:
+            pass
+        keys.append(str(order_id))
+    order_ids = list(dict.fromkeys(keys))
+
+    sources = statuses_leading_to(new_status)
+    with transaction.atomic():
+        orders = {
+            str(order.pk): order
+            for order in Order.objects.select_for_update().filter(pk__in=valid_ids).only('id', 'status', 'created_at')
+        }
+        movable = [order for order in orders.values() if order.status in sources]
+        if movable:
+            Order.objects.filter(pk__in=[order.pk for order in movable], status__in=sources).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            record_status_changes([(order, order.status, new_status) for order in movable])
+
+    results = {}
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = 'not_found'
+        elif order.status == new_status:
+            results[order_id] = 'unchanged'
+        elif order.status in sources:
+            results[order_id] = 'updated'
+        else:
+            results[order_id] = 'not_allowed'
+    return results
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .homepage import invalidate_home_page, is_featured
+from .models import Flower, FlowerImage, MainPageContent
+
+
+@receiver(post_save, sender=Flower)
+@receiver(post_delete, sender=Flower)
+@receiver(post_save, sender=MainPageContent)
+def catalog_changed(sender, **kwargs):
+    """Bump the catalog version once the change is visible to other connections"""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=MainPageContent)
+@receiver(post_delete, sender=MainPageContent)
+def main_page_content_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_home_page)
+
+
+@receiver(post_save, sender=Flower)
+@receiver(post_delete, sender=Flower)
+def flower_changed(sender, instance, **kwargs):
+    """Drop the cached home page when a flower joins, leaves or is on it"""
+    if instance.to_be_on_main_page or is_featured(instance.pk):
+        transaction.on_commit(invalidate_home_page)
+
+
+@receiver(post_save, sender=FlowerImage)
+@receiver(post_delete, sender=FlowerImage)
+def flower_image_changed(sender, instance, origin=None, **kwargs):
+    """
+    Copy the main image url onto the flower before bumping the version and
+    dropping the home page, so nothing is rebuilt from the old url
+    """
+    # Images deleted along with their flower leave nothing to sync
+    if not isinstance(origin, Flower):
+        FlowerImage.sync_main_image_url(instance.flower_id)
+    catalog_changed(sender)
+    if is_featured(instance.flower_id):
+        transaction.on_commit(invalidate_home_page)
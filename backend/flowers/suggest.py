@@ -0,0 +1,134 @@
+"""
+Typeahead suggestions for the products search box.
+
+Keystroke traffic is answered from a per-worker prefix trie over active
+flower names (and every word inside them) and categories. Each trie node
+keeps its best completions precomputed, so a lookup is one walk down the
+typed prefix. The trie is stamped with the catalog version and rebuilt as
+a whole when it moves, the same way as the catalog index.
+
+When the trie cannot fill the list (typos, mid-word fragments) and the
+database is PostgreSQL, the remaining slots come from the pg_trgm GIN
+index on flowers.name.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .catalog import get_catalog_index, get_catalog_version
+from .models import Flower
+
+# Completions kept per trie node, the most a request can ask for
+TRIE_TOP = 10
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SuggestionTrie:
+    """
+    Immutable prefix trie of suggestions.
+    Entries are dicts ({'type', 'name', 'id'}); shorter names rank first.
+    """
+
+    def __init__(self, entries, version):
+        self.version = version
+        self.root = _Node()
+        self.size = 0
+
+        ranked = sorted(entries, key=lambda entry: (len(entry['name']), entry['name']))
+        for entry in ranked:
+            name = entry['name'].casefold()
+            words = name.split()
+            # The full name plus every later word, so "վարդ" finds "Կարմիր վարդեր"
+            keys = {name} | {' '.join(words[i:]) for i in range(1, len(words))}
+            for key in keys:
+                self._insert(key, entry)
+            self.size += 1
+
+    def _insert(self, key, entry):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            # Entries arrive best first, so the first TRIE_TOP are the top ones
+            if len(node.top) < TRIE_TOP and not (node.top and node.top[-1] is entry):
+                node.top.append(entry)
+
+    def search(self, prefix, limit=TRIE_TOP):
+        """Return up to limit entries whose name (or a word in it) starts with prefix"""
+        node = self.root
+        for char in ' '.join(prefix.casefold().split()):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit]
+
+
+def build_suggestion_trie(version):
+    """Collect active flower names and their categories into a trie"""
+    if settings.CATALOG_INDEX_ENABLED:
+        rows = [(flower.id, flower.name, flower.category) for flower in get_catalog_index().flowers]
+    else:
+        rows = Flower.objects.filter(is_active=True).values_list('id', 'name', 'category')
+
+    entries = []
+    categories = set()
+    for flower_id, name, category in rows:
+        entries.append({'type': 'flower', 'name': name, 'id': str(flower_id)})
+        categories.add(category)
+    entries.extend({'type': 'category', 'name': category, 'id': None} for category in categories)
+    return SuggestionTrie(entries, version)
+
+
+_suggestion_trie = None
+_suggestion_trie_lock = threading.Lock()
+
+
+def get_suggestion_trie():
+    """Return this worker's trie, rebuilding it when the catalog version moved"""
+    global _suggestion_trie
+
+    version = get_catalog_version()
+    trie = _suggestion_trie
+    if trie is not None and trie.version == version:
+        return trie
+
+    with _suggestion_trie_lock:
+        trie = _suggestion_trie
+        if trie is None or trie.version != version:
+            trie = build_suggestion_trie(version)
+            _suggestion_trie = trie
+    return trie
+
+
+def fuzzy_flower_suggestions(query, limit, exclude=()):
+    """Closest active flower names by trigram similarity (PostgreSQL only)"""
+    if connection.vendor != 'postgresql' or limit <= 0:
+        return []
+
+    # The % operator is what the gin_trgm_ops index answers
+    rows = Flower.objects.filter(is_active=True).filter(
+        RawSQL('flowers.name %% %s', (query,), output_field=BooleanField())
+    ).exclude(id__in=exclude).annotate(
+        similarity=RawSQL('similarity(flowers.name, %s)', (query,), output_field=FloatField())
+    ).order_by('-similarity').values_list('id', 'name')[:limit]
+    return [{'type': 'flower', 'name': name, 'id': str(flower_id)} for flower_id, name in rows]
+
+
+def get_suggestions(query, limit):
+    """Trie completions first, topped up with fuzzy matches when there are too few"""
+    limit = max(1, min(limit, TRIE_TOP))
+    suggestions = get_suggestion_trie().search(query, limit)
+    if len(suggestions) < limit and len(query) >= settings.SUGGEST_FUZZY_MIN_LENGTH:
+        seen = [entry['id'] for entry in suggestions if entry['id']]
+        suggestions = suggestions + fuzzy_flower_suggestions(query, limit - len(suggestions), seen)
+    return suggestions
@@ -7,12 +7,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.db.models import Prefetch, Q
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
-from datetime import datetime
-from .models import Flower, FlowerImage, Order, OrderItem, MainPageContent
+from .models import Flower, FlowerImage, Order, OrderItem, MainPageContent, effective_price
+from .cart import CartFullError, get_cart_store, get_cart_context, hydrate_cart, snapshot_flower
+from .catalog import get_catalog_index, get_catalog_version
+from .conditional import catalog_page
+from .facets import facet_options, get_facets
+from .homepage import get_home_page
+from .pagination import CountingPaginator, KeysetPaginator
+from .queries import card_queryset
+from .search import search_flowers
+from .suggest import get_suggestions
+from .export import EXPORT_FORMATS, export_lines, filter_orders
+from .rollup import sales_stats
+from .services import (
+    ORDER_TRANSITIONS, OrderStatusError, bulk_change_order_status, change_order_status,
+    find_idempotent_order, idempotency_scope, place_order_once,
+)
+from .utils import queue_order_email
 import json
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
 
 # ==================== CONSTANTS ====================
 CATEGORIES = [
@@ -37,74 +59,53 @@ COLORS = [
     ('Բազմագույն', 'Բազմագույն'),
 ]
 
+# Shown when the cart no longer fits in its cookie
+CART_FULL_MESSAGE = 'Զամբյուղն այլևս տեղ չունի, նախ ձևակերպեք պատվերը'
 
-# ==================== HELPER FUNCTIONS ====================
-def get_cart_context(request):
-    """Helper function to get cart context for all views"""
-    cart = request.session.get('cart', {})
-    cart_items = []
-    cart_total = 0
-    cart_count = 0
-    
-    for flower_id, item_data in cart.items():
-        try:
-            flower = Flower.objects.get(id=flower_id, is_active=True)
-            price = flower.sale_price_amd if flower.sale_price_amd else flower.price_amd
-            quantity = item_data.get('quantity', 1)
-            
-            cart_items.append({
-                'id': str(flower.id),
-                'name': flower.name,
-                'price': float(flower.price_amd),
-                'sale_price': float(flower.sale_price_amd) if flower.sale_price_amd else None,
-                'image': item_data.get('image', ''),
-                'category': flower.category,
-                'quantity': quantity,
-                'subtotal': float(flower.price_amd) * quantity,
-                'sale_subtotal': float(price) * quantity,
-            })
-            cart_total += float(price) * quantity
-            cart_count += quantity
-        except Flower.DoesNotExist:
-            continue
-    
-    return {
-        'cart_items': cart_items,
-        'cart_total': cart_total,
-        'cart_count': cart_count,
-        'current_year': datetime.now().year
-    }
+SORT_OPTIONS = [
+    ('newest', 'Նորերը'),
+    ('price_asc', 'Գինը՝ աճման կարգով'),
+    ('price_desc', 'Գինը՝ նվազման կարգով'),
+]
+
+SORT_ORDERS = {
+    'newest': ('-created_at', '-id'),
+    'price_asc': ('effective_price_amd', '-created_at'),
+    'price_desc': ('-effective_price_amd', '-created_at'),
+}
 
 
 # ==================== PUBLIC VIEWS ====================
+@catalog_page
 def home(request):
     """Home page view"""
-    main_content, _ = MainPageContent.objects.get_or_create(
-        id='00000000-0000-0000-0000-000000000001'
-    )
-    
-    featured_flowers = Flower.objects.filter(
-        is_active=True, 
-        to_be_on_main_page=True
-    ).prefetch_related('images')[:4]
+    home_page = get_home_page()
+    main_content = home_page['main_content']
+    featured_flowers = home_page['featured_flowers']
     
     context = {
         'main_content': main_content,
         'featured_flowers': featured_flowers,
     }
-    context.update(get_cart_context(request))
     
     return render(request, 'home.html', context)
 
 
-def products(request):
-    """Products listing page"""
-    flowers = Flower.objects.filter(is_active=True).prefetch_related('images')
-    
-    # Filters
-    category = request.GET.get('category', 'բոլորը')
-    color = request.GET.get('color', 'բոլորը')
-    search_query = request.GET.get('search', '')
+def parse_price(value):
+    """Price filter from the query string, None when missing or invalid"""
+    try:
+        price = Decimal(value)
+    except (TypeError, ArithmeticError):
+        return None
+    return price if price.is_finite() and price >= 0 else None
+
+
+def listing_queryset(category, color, search_query, ranked_search=False,
+                     min_price=None, max_price=None, sort=''):
+    """Active flowers matching the products page filters"""
+    flowers = card_queryset(Flower.objects.filter(is_active=True)).annotate(
+        effective_price_amd=effective_price()
+    )
     
     if category and category != 'բոլորը':
         flowers = flowers.filter(category=category)
@@ -112,39 +113,123 @@ def products(request):
     if color and color != 'բոլորը':
         flowers = flowers.filter(colors__contains=[color])
     
-    if search_query:
+    # Price filters and sorts run on the indexed effective price column
+    if min_price is not None:
+        flowers = flowers.filter(effective_price_amd__gte=min_price)
+    
+    if max_price is not None:
+        flowers = flowers.filter(effective_price_amd__lte=max_price)
+    
+    if ranked_search:
+        flowers = search_flowers(flowers, search_query)
+    elif search_query:
         flowers = flowers.filter(name__icontains=search_query)
     
-    # Pagination
-    paginator = Paginator(flowers, 21)
-    page_number = request.GET.get('page', 1)
-    flowers_page = paginator.get_page(page_number)
+    if sort in SORT_ORDERS:
+        flowers = flowers.order_by(*SORT_ORDERS[sort])
+    
+    return flowers
+
+
+@catalog_page
+def products(request):
+    """Products listing page"""
+    # Filters
+    category = request.GET.get('category', 'բոլորը')
+    color = request.GET.get('color', 'բոլորը')
+    search_query = request.GET.get('search', '')
+    min_price = parse_price(request.GET.get('min_price'))
+    max_price = parse_price(request.GET.get('max_price'))
+    sort = request.GET.get('sort', '')
+    if sort not in SORT_ORDERS:
+        sort = ''
+    
+    # Ranked full-text search needs the database, the index only does substrings
+    ranked_search = bool(search_query) and settings.PRODUCTS_SEARCH_ENGINE == 'fulltext'
+    price_query = min_price is not None or max_price is not None or sort in ('price_asc', 'price_desc')
+    # Price filters and sorts are answered by the database index as well
+    use_index = settings.CATALOG_INDEX_ENABLED and not ranked_search and not price_query
+    
+    if use_index:
+        flowers = get_catalog_index().filter(
+            category=category if category != 'բոլորը' else None,
+            color=color if color != 'բոլորը' else None,
+            search=search_query,
+        )
+    else:
+        flowers = listing_queryset(
+            category, color, search_query, ranked_search, min_price, max_price, sort
+        )
+    
+    # Pagination: keyset cursors avoid OFFSET/COUNT deep in the listing
+    # (ranked and price-sorted results keep numbered pages)
+    cursor_mode = not ranked_search and sort in ('', 'newest') and (
+        settings.PRODUCTS_PAGINATION == 'cursor' or 'cursor' in request.GET
+    )
+    if cursor_mode:
+        flowers_page = KeysetPaginator(flowers, 21).get_page(request.GET.get('cursor'))
+    else:
+        paginator = CountingPaginator(flowers, 21)
+        page_number = request.GET.get('page', 1)
+        flowers_page = paginator.get_page(page_number)
+    
+    facets = get_facets(
+        listing_queryset(None, None, search_query, ranked_search, min_price, max_price),
+        category, color,
+        {'search': search_query, 'ranked': ranked_search, 'min_price': min_price, 'max_price': max_price},
+        use_index=use_index,
+    )
+    
+    # Query string of the active filters, carried by the pagination links
+    filters = {
+        'category': category, 'color': color, 'search': search_query,
+        'min_price': min_price, 'max_price': max_price, 'sort': sort,
+    }
+    filter_query = urlencode({key: value for key, value in filters.items() if value not in (None, '', 'բոլորը')})
     
     context = {
         'flowers': flowers_page,
-        'categories': CATEGORIES,
-        'colors': COLORS,
+        'cursor_mode': cursor_mode,
+        'categories': facet_options(CATEGORIES, facets and facets['categories'], category),
+        'colors': facet_options(COLORS, facets and facets['colors'], color),
+        'sort_options': SORT_OPTIONS,
         'category': category,
         'color': color,
         'search_query': search_query,
+        'min_price': min_price,
+        'max_price': max_price,
+        'sort': sort,
+        'filter_query': filter_query,
     }
-    context.update(get_cart_context(request))
     
     return render(request, 'products.html', context)
 
 
+@require_http_methods(["GET"])
+def suggest(request):
+    """Typeahead suggestions for the products search box (JSON)"""
+    query = request.GET.get('q', '').strip()
+    suggestions = get_suggestions(query, settings.SUGGEST_LIMIT) if query else []
+    return JsonResponse({'query': query, 'suggestions': suggestions})
+
+
+@catalog_page
 def product_detail(request, product_id):
     """Product detail page"""
-    product = get_object_or_404(
-        Flower.objects.prefetch_related('images'), 
-        id=product_id, 
-        is_active=True
-    )
+    if settings.CATALOG_INDEX_ENABLED:
+        product = get_catalog_index().get(product_id)
+        if product is None:
+            raise Http404('Flower not found')
+    else:
+        product = get_object_or_404(
+            Flower.objects.prefetch_related('images'), 
+            id=product_id, 
+            is_active=True
+        )
     
     context = {
         'product': product,
     }
-    context.update(get_cart_context(request))
     
     return render(request, 'product_detail.html', context)
 
@@ -155,50 +240,93 @@ def contact(request):
         messages.success(request, 'Ձեր հաղորդագրությունը ուղարկված է')
         return redirect('contact')
     
-    context = get_cart_context(request)
-    return render(request, 'contact.html', context)
+    return render(request, 'contact.html')
 
 
 # ==================== CART VIEWS ====================
+def is_partial_cart_request(request):
+    """True for clients that want a JSON or HTML fragment answer instead of a redirect"""
+    return (
+        'application/json' in request.headers.get('Accept', '')
+        or request.headers.get('HX-Request') == 'true'
+    )
+
+
+def cart_update_response(request, product_id):
+    """
+    Answer a cart mutation.
+    JSON and fragment (HX-Request) clients get only the changed line, the
+    totals and the badge count; everyone else is redirected to the cart.
+    """
+    if not is_partial_cart_request(request):
+        return redirect('cart')
+
+    cart_context = get_cart_context(request)
+    item = next(
+        (item for item in cart_context['cart_items'] if item['id'] == str(product_id)),
+        None
+    )
+
+    if request.headers.get('HX-Request') == 'true':
+        response = render(request, 'cart_fragment.html', {
+            'item': item,
+            'product_id': product_id,
+            **cart_context,
+        })
+    else:
+        response = JsonResponse({
+            'item': item,
+            'cart_total': cart_context['cart_total'],
+            'cart_count': cart_context['cart_count'],
+            'cart_lines': len(cart_context['cart_items']),
+        })
+    response['X-Cart-Count'] = cart_context['cart_count']
+    return response
+
+
 @require_http_methods(["POST"])
 def add_to_cart(request, product_id):
     """Add product to cart"""
     try:
+        # Read the version before the row, so a concurrent change is never masked
+        version = get_catalog_version()
         flower = Flower.objects.get(id=product_id, is_active=True)
         quantity = int(request.POST.get('quantity', 1))
         
-        cart = request.session.get('cart', {})
-        main_image = flower.images.filter(is_main=True).first()
-        image_url = main_image.image.url if main_image else ''
+        cart = get_cart_store(request).items
         
         if str(product_id) in cart:
             cart[str(product_id)]['quantity'] += quantity
         else:
-            cart[str(product_id)] = {
-                'quantity': quantity,
-                'image': image_url,
-            }
+            cart[str(product_id)] = {'quantity': quantity}
+        # Refresh the snapshot while we have the row anyway
+        cart[str(product_id)].update(snapshot_flower(flower, version))
         
-        request.session['cart'] = cart
-        request.session.modified = True
+        get_cart_store(request).save(cart)
         
-        messages.success(request, f'{flower.name} ավելացվել է զամբյուղում')
+        if not is_partial_cart_request(request):
+            messages.success(request, f'{flower.name} ավելացվել է զամբյուղում')
     except Flower.DoesNotExist:
+        if is_partial_cart_request(request):
+            return JsonResponse({'error': 'Ծաղիկը չի գտնվել'}, status=404)
         messages.error(request, 'Ծաղիկը չի գտնվել')
+    except CartFullError:
+        if is_partial_cart_request(request):
+            return JsonResponse({'error': CART_FULL_MESSAGE}, status=400)
+        messages.error(request, CART_FULL_MESSAGE)
     
-    return redirect('cart')
+    return cart_update_response(request, product_id)
 
 
 def cart(request):
     """Shopping cart page"""
-    context = get_cart_context(request)
-    return render(request, 'cart.html', context)
+    return render(request, 'cart.html')
 
 
 @require_http_methods(["POST"])
 def update_cart(request, product_id):
     """Update cart item quantity"""
-    cart = request.session.get('cart', {})
+    cart = get_cart_store(request).items
     action = request.POST.get('action')
     
     if str(product_id) in cart:
@@ -209,31 +337,34 @@ def update_cart(request, product_id):
             if cart[str(product_id)]['quantity'] <= 0:
                 del cart[str(product_id)]
         
-        request.session['cart'] = cart
-        request.session.modified = True
+        try:
+            get_cart_store(request).save(cart)
+        except CartFullError:
+            if is_partial_cart_request(request):
+                return JsonResponse({'error': CART_FULL_MESSAGE}, status=400)
+            messages.error(request, CART_FULL_MESSAGE)
     
-    return redirect('cart')
+    return cart_update_response(request, product_id)
 
 
 @require_http_methods(["POST"])
 def remove_from_cart(request, product_id):
     """Remove item from cart"""
-    cart = request.session.get('cart', {})
+    cart = get_cart_store(request).items
     
     if str(product_id) in cart:
         del cart[str(product_id)]
-        request.session['cart'] = cart
-        request.session.modified = True
-        messages.success(request, 'Ապրանքը հեռացվել է զամբյուղից')
+        get_cart_store(request).save(cart)
+        if not is_partial_cart_request(request):
+            messages.success(request, 'Ապրանքը հեռացվել է զամբյուղից')
     
-    return redirect('cart')
+    return cart_update_response(request, product_id)
 
 
 @require_http_methods(["POST"])
 def clear_cart(request):
     """Clear entire cart"""
-    request.session['cart'] = {}
-    request.session.modified = True
+    get_cart_store(request).clear()
     messages.success(request, 'Զամբյուղը մաքրված է')
     
     return redirect('cart')
@@ -241,70 +372,67 @@ def clear_cart(request):
 
 def checkout(request):
     """Checkout page"""
-    cart_context = get_cart_context(request)
+    cart_context = dict(get_cart_context(request))
     
     # Handle buy now
     buy_now_id = request.GET.get('buy_now')
     buy_now_quantity = int(request.GET.get('quantity', 1))
     
     if buy_now_id:
-        try:
-            flower = Flower.objects.get(id=buy_now_id, is_active=True)
-            price = flower.sale_price_amd if flower.sale_price_amd else flower.price_amd
-            main_image = flower.images.filter(is_main=True).first()
-            
-            cart_context['cart_items'] = [{
-                'id': str(flower.id),
-                'name': flower.name,
-                'price': float(flower.price_amd),
-                'sale_price': float(flower.sale_price_amd) if flower.sale_price_amd else None,
-                'image': main_image.image.url if main_image else '',
-                'category': flower.category,
-                'quantity': buy_now_quantity,
-                'subtotal': float(flower.price_amd) * buy_now_quantity,
-                'sale_subtotal': float(price) * buy_now_quantity,
-            }]
-            cart_context['cart_total'] = float(price) * buy_now_quantity
-            cart_context['is_buy_now'] = True
-        except Flower.DoesNotExist:
+        cart_items = hydrate_cart({buy_now_id: {'quantity': buy_now_quantity}})
+        if not cart_items:
             return redirect('cart')
+
+        cart_context['cart_items'] = cart_items
+        cart_context['cart_total'] = cart_items[0]['sale_subtotal']
+        cart_context['is_buy_now'] = True
+    
+    idempotency_key = request.POST.get('idempotency_key') or request.headers.get('Idempotency-Key')
+    client_scope = idempotency_scope(request)
+    
+    # A retried submission (double click, mobile retry) of an order this
+    # client already placed, which emptied the cart: answer like the first
+    # one. With the cart still filled place_order_once compares the request.
+    if (request.method == 'POST' and idempotency_key and not cart_context['cart_items']
+            and find_idempotent_order(client_scope, idempotency_key)):
+        messages.success(request, 'Պատվերը հաջողությամբ ընդունված է')
+        return redirect('home')
     
     if not cart_context['cart_items']:
         return redirect('cart')
     
     # Handle POST - create order
     if request.method == 'POST':
+        customer_email = request.POST.get('email')
+
+        def queue_email(order):
+            # The email itself is sent by the process_email_outbox worker
+            if customer_email:
+                queue_order_email(customer_email, order)
+
         try:
-            order = Order.objects.create(
-                customer_name=request.POST.get('fullName'),
-                customer_email=request.POST.get('email', ''),
-                customer_phone=request.POST.get('phone'),
-                delivery_city=request.POST.get('city'),
-                delivery_address=request.POST.get('address'),
-                delivery_notes=request.POST.get('notes', ''),
-                bacik_erktox=request.POST.get('bacik_erktox', ''),
-                payment_method=request.POST.get('paymentMethod', 'cash'),
-                total_amount_amd=cart_context['cart_total'],
-                status='pending'
+            order, created = place_order_once(
+                idempotency_key,
+                {
+                    'customer_name': request.POST.get('fullName'),
+                    'customer_email': request.POST.get('email', ''),
+                    'customer_phone': request.POST.get('phone'),
+                    'delivery_city': request.POST.get('city'),
+                    'delivery_address': request.POST.get('address'),
+                    'delivery_notes': request.POST.get('notes', ''),
+                    'bacik_erktox': request.POST.get('bacik_erktox', ''),
+                    'payment_method': request.POST.get('paymentMethod', 'cash'),
+                },
+                [
+                    {'flower_id': item['id'], 'quantity': item['quantity']}
+                    for item in cart_context['cart_items']
+                ],
+                on_placed=queue_email,
+                scope=client_scope,
             )
             
-            # Create order items
-            for item in cart_context['cart_items']:
-                flower = Flower.objects.get(id=item['id'])
-                price = flower.sale_price_amd if flower.sale_price_amd else flower.price_amd
-                
-                OrderItem.objects.create(
-                    order=order,
-                    flower=flower,
-                    flower_name=flower.name,
-                    flower_image_url=item['image'],
-                    price_amd_at_purchase=price,
-                    quantity=item['quantity']
-                )
-            
-            if not buy_now_id:
-                request.session['cart'] = {}
-                request.session.modified = True
+            if created and not buy_now_id:
+                get_cart_store(request).clear()
             
             messages.success(request, 'Պատվերը հաջողությամբ ընդունված է')
             return redirect('home')
@@ -312,6 +440,8 @@ def checkout(request):
         except Exception as e:
             messages.error(request, f'Սխալ: {str(e)}')
     
+    # Fresh key for each rendered form, so only resubmissions of it repeat
+    cart_context['idempotency_key'] = uuid.uuid4().hex
     return render(request, 'checkout.html', cart_context)
 
 
@@ -334,8 +464,7 @@ def admin_login_view(request):
         else:
             messages.error(request, 'Սխալ օգտագործողի անուն կամ գաղտնաբառ')
     
-    context = get_cart_context(request)
-    return render(request, 'admin_login.html', context)
+    return render(request, 'admin_login.html')
 
 
 def is_staff(user):
@@ -352,6 +481,122 @@ def admin_logout(request):
     return redirect('admin_login')
 
 
+# ==================== ADMIN DASHBOARD HELPERS ====================
+ADMIN_PAGE_SIZES = (10, 25, 50, 100)
+ADMIN_DEFAULT_PAGE_SIZE = 25
+ADMIN_TABS = ('products', 'orders', 'sales', 'main-page')
+FLOWER_FILTER_KEYS = ('flower_search', 'flower_category', 'flower_page_size')
+ORDER_FILTER_KEYS = ('order_status', 'order_from', 'order_to', 'order_search', 'order_page_size')
+STATS_FILTER_KEYS = ('stats_from', 'stats_to')
+
+
+# Only the item columns the orders list shows
+DASHBOARD_ORDER_ITEMS = Prefetch(
+    'items',
+    queryset=OrderItem.objects.only('order_id', 'flower_name', 'quantity', 'price_amd_at_purchase')
+)
+
+
+def parse_page_size(value):
+    """Per-section page size from the query string, limited to ADMIN_PAGE_SIZES"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return ADMIN_DEFAULT_PAGE_SIZE
+    return size if size in ADMIN_PAGE_SIZES else ADMIN_DEFAULT_PAGE_SIZE
+
+
+def parse_day(value):
+    """Date filter (YYYY-MM-DD) from the query string, None when missing or invalid"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def dashboard_url(params, tab, **changes):
+    """Dashboard query string with some parameters replaced (None removes them)"""
+    query = params.copy()
+    query['tab'] = tab
+    for key, value in changes.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    return '?' + query.urlencode()
+
+
+def stats_range(params):
+    """Report window from ?stats_from=&stats_to=, the last SALES_STATS_DAYS days by default"""
+    date_to = parse_day(params.get('stats_to')) or timezone.localdate()
+    date_from = parse_day(params.get('stats_from')) or date_to - timedelta(days=settings.SALES_STATS_DAYS - 1)
+    return date_from, date_to
+
+
+def carried_filters(params, keys):
+    """(key, value) pairs of the other section's filters, kept as hidden fields in a filter form"""
+    return [(key, params[key]) for key in keys if params.get(key)]
+
+
+def dashboard_flowers(params):
+    """Flowers matching the dashboard filters"""
+    flowers = Flower.objects.all()
+
+    search_query = params.get('flower_search', '').strip()
+    if search_query:
+        flowers = flowers.filter(name__icontains=search_query)
+
+    category = params.get('flower_category', '')
+    if category and category != 'բոլորը':
+        flowers = flowers.filter(category=category)
+
+    return flowers
+
+
+def dashboard_orders(params):
+    """Orders matching the dashboard filters: status, created date range and search"""
+    status = params.get('order_status', '')
+    orders = filter_orders(
+        Order.objects.all(),
+        status=status if status in dict(Order.STATUS_CHOICES) else None,
+        date_from=parse_day(params.get('order_from')),
+        date_to=parse_day(params.get('order_to')),
+    )
+
+    search_query = params.get('order_search', '').strip()
+    if search_query:
+        condition = (
+            Q(customer_name__icontains=search_query)
+            | Q(customer_phone__icontains=search_query)
+            | Q(customer_email__icontains=search_query)
+        )
+        try:
+            condition |= Q(id=uuid.UUID(search_query))
+        except ValueError:
+            pass
+        orders = orders.filter(condition)
+
+    return orders
+
+
+def dashboard_section(params, queryset, prefix, tab):
+    """
+    One keyset-paginated dashboard section: only its visible page is loaded,
+    and the total comes from a (possibly estimated) count
+    """
+    page_size = parse_page_size(params.get(f'{prefix}_page_size'))
+    page = KeysetPaginator(queryset, page_size).get_page(params.get(f'{prefix}_cursor'))
+    paginator = CountingPaginator(queryset, page_size, count_mode='estimate')
+    cursor_key = f'{prefix}_cursor'
+    return {
+        'page': page,
+        'count': paginator.count,
+        'count_is_estimate': paginator.count_is_estimate,
+        'page_size': page_size,
+        'next_url': dashboard_url(params, tab, **{cursor_key: page.next_cursor}) if page.has_next else None,
+        'previous_url': dashboard_url(params, tab, **{cursor_key: page.previous_cursor}) if page.has_previous else None,
+    }
+
+
 # ==================== ADMIN DASHBOARD VIEW ====================
 @login_required
 @user_passes_test(is_staff)
@@ -363,15 +608,9 @@ def admin_dashboard(request):
     GET: Display dashboard
     POST: Handle forms (add/edit flower, update order status, update main page)
     """
-    # Get all flowers
-    flowers = Flower.objects.all().prefetch_related('images').order_by('-created_at')
-    
-    # Get all orders
-    orders = Order.objects.all().prefetch_related('items__flower').order_by('-created_at')
-    
     # Get main page content
     main_content, _ = MainPageContent.objects.get_or_create(
-        id='00000000-0000-0000-0000-000000000001'
+        id=MainPageContent.SINGLETON_ID
     )
     
     # Handle POST requests
@@ -458,24 +697,37 @@ def admin_dashboard(request):
                 order_id = request.POST.get('order_id')
                 new_status = request.POST.get('status')
                 
-                order = Order.objects.get(id=order_id)
-                
                 # Validate status
                 valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
                 if new_status not in valid_statuses:
                     messages.error(request, 'Անվալիդ կարգավիճակ')
                     return redirect('admin_dashboard')
                 
-                order.status = new_status
-                order.save()
+                change_order_status(order_id, new_status)
                 messages.success(request, f'Պատվեր #{order_id} կարգավիճակ թարմացված է')
                 
             except Order.DoesNotExist:
                 messages.error(request, 'Պատվերը չի գտնվել')
+            except OrderStatusError:
+                messages.error(request, 'Այս կարգավիճակից անցումը թույլատրված չէ')
             except Exception as e:
                 messages.error(request, f'Սխալ թարմացնելիս: {str(e)}')
         
         
+        elif action == 'bulk_update_order_status':
+            """Move the selected orders to one status"""
+            new_status = request.POST.get('status')
+            order_ids = request.POST.getlist('order_ids')
+            if new_status not in ORDER_TRANSITIONS or not order_ids:
+                messages.error(request, 'Ընտրեք պատվերներ և կարգավիճակ')
+            else:
+                summary = Counter(bulk_change_order_status(order_ids, new_status).values())
+                messages.success(request, f"Թարմացված է {summary['updated']} պատվեր")
+                skipped = summary['not_allowed'] + summary['not_found']
+                if skipped:
+                    messages.warning(request, f'{skipped} պատվեր չի թարմացվել (անցումը թույլատրված չէ կամ չի գտնվել)')
+        
+        
         # ==================== MAIN PAGE OPERATIONS ====================
         elif action == 'update_main_page':
             """Update main page content"""
@@ -496,14 +748,73 @@ def admin_dashboard(request):
             except Exception as e:
                 messages.error(request, f'Սխալ թարմացնելիս: {str(e)}')
         
-        return redirect('admin_dashboard')
+        # Back to the same filters and page the form was posted from
+        return redirect(request.get_full_path())
     
-    # GET request - display dashboard
+    # GET request - display one page of each section
+    params = request.GET
+    active_tab = params.get('tab')
     context = {
-        'flowers': flowers,
-        'orders': orders,
+        'flowers': dashboard_section(params, dashboard_flowers(params), 'flower', 'products'),
+        'orders': dashboard_section(params, dashboard_orders(params).prefetch_related(DASHBOARD_ORDER_ITEMS), 'order', 'orders'),
         'main_content': main_content,
+        'active_tab': active_tab if active_tab in ADMIN_TABS else 'products',
+        'filters': params,
+        'page_sizes': ADMIN_PAGE_SIZES,
+        'flower_form_carry': carried_filters(params, ORDER_FILTER_KEYS + STATS_FILTER_KEYS),
+        'order_form_carry': carried_filters(params, FLOWER_FILTER_KEYS + STATS_FILTER_KEYS + ('order_status',)),
+        'sales_form_carry': carried_filters(params, FLOWER_FILTER_KEYS + ORDER_FILTER_KEYS),
+        'categories': CATEGORIES,
+        'order_statuses': Order.STATUS_CHOICES,
+        'sales': sales_stats(*stats_range(params)),
+        'export_query': urlencode(carried_filters(params, ('order_status', 'order_from', 'order_to', 'order_search'))),
+        'status_urls': [
+            (value, label, dashboard_url(params, 'orders', order_status=value or None, order_cursor=None))
+            for value, label in [('', 'Բոլորը')] + Order.STATUS_CHOICES
+        ],
     }
-    context.update(get_cart_context(request))
     
-    return render(request, 'admin_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'admin_dashboard.html', context)
+
+
+@login_required
+@user_passes_test(is_staff)
+def admin_sales_stats(request):
+    """Sales figures for ?stats_from=&stats_to=, read from the daily rollup, as JSON"""
+    return JsonResponse(sales_stats(*stats_range(request.GET)))
+
+
+@login_required
+@user_passes_test(is_staff)
+def admin_export_orders(request):
+    """
+    Stream the orders matching the dashboard filters as CSV or NDJSON
+    (?format=). Rows are read through a server-side cursor in chunks of
+    ORDER_EXPORT_CHUNK_SIZE and written as they come, so the worker's
+    memory does not grow with the export.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f'Unknown format {export_format}'}, status=400)
+
+    lines = export_lines(dashboard_orders(request.GET), export_format, settings.ORDER_EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    filename = f'orders-{timezone.localdate():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_staff)
+@require_http_methods(["POST"])
+def admin_bulk_order_status(request):
+    """
+    Move the orders in POST order_ids to POST status with one conditional
+    UPDATE, answering {'status': ..., 'results': {order_id: result}}
+    """
+    new_status = request.POST.get('status')
+    if new_status not in ORDER_TRANSITIONS:
+        return JsonResponse({'error': 'Անվալիդ կարգավիճակ'}, status=400)
+
+    results = bulk_change_order_status(request.POST.getlist('order_ids'), new_status)
+    return JsonResponse({'status': new_status, 'results': results})
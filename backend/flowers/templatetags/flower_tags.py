@@ -0,0 +1,45 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Bump when product_card.html changes so stale markup is not served
+CARD_CACHE_PREFIX = 'product_card:v2'
+
+
+def product_card_cache_key(flower):
+    """
+    Cache key for a rendered card: flower id plus its updated_at, which
+    also moves when the main image changes
+    """
+    return f'{CARD_CACHE_PREFIX}:{flower.id}:{flower.updated_at.timestamp()}'
+
+
+@register.simple_tag
+def product_cards(flowers):
+    """
+    Render product_card.html for every flower on the page.
+    All cards are looked up with one multi-get; only the misses are
+    rendered and they are written back in one batch.
+
+    Usage: {% product_cards flowers as cards %}{% for card in cards %}...
+    """
+    flowers = list(flowers)
+    keys = [product_card_cache_key(flower) for flower in flowers]
+    cached = cache.get_many(keys)
+
+    missing = {}
+    cards = []
+    for flower, key in zip(flowers, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string('product_card.html', {'product': flower})
+            missing[key] = card
+        cards.append(mark_safe(card))
+
+    if missing:
+        cache.set_many(missing, settings.PRODUCT_CARD_CACHE_TIMEOUT)
+    return cards
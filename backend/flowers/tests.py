@@ -1,3 +1,1133 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .cart import CacheCartStore, CartFullError, SessionCartStore, SignedCookieCartStore, get_cart_context
+from .catalog import CATALOG_VERSION_KEY, bump_catalog_version, get_catalog_index, get_catalog_version
+from .context_processors import cart
+from .export import ORDER_COLUMNS
+from .facets import count_facets_python, facet_options, get_facets
+from .homepage import HOME_PAGE_KEY, HOME_PAGE_LOCK_KEY, get_home_page
+from .models import (
+    DailySalesRollup, EmailOutbox, Flower, FlowerImage, IdempotencyKey, MainPageContent, Order, OrderItem,
+)
+from .pagination import CountingPaginator, InvalidCursor, KeysetPaginator, decode_cursor
+from .search import build_prefix_query, search_flowers
+from .serializers import FlowerListSerializer
+from .suggest import SuggestionTrie, get_suggestion_trie
+from .rollup import rebuild_rollup, record_status_changes, sales_stats
+from .services import (
+    OrderPlacementError, OrderStatusError, bulk_change_order_status, change_order_status, place_order,
+    place_order_once,
+)
+from .templatetags.flower_tags import product_cards
+from .utils import deliver_outbox_batch, queue_order_email
+
+
+def create_flower(index, **kwargs):
+    fields = {
+        'name': f'Flower {index}',
+        'price_amd': 1000 + index,
+        'description': 'Test flower',
+        'category': 'Վարդեր',
+        'colors': ['Կարմիր'],
+    }
+    fields.update(kwargs)
+    flower = Flower.objects.create(**fields)
+    FlowerImage.objects.create(flower=flower, url=f'https://example.com/{index}.jpg', is_main=True)
+    FlowerImage.objects.create(flower=flower, url=f'https://example.com/{index}-2.jpg')
+    return flower
+
+
+class CartContextTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def make_request(self, flowers):
+        request = self.factory.get('/')
+        request.session = SessionStore()
+        request.cart = SessionCartStore(request)
+        request.cart.save({str(flower.id): {'quantity': 2} for flower in flowers})
+        return request
+
+    def test_query_count_is_constant_as_cart_grows(self):
+        flowers = [create_flower(i) for i in range(15)]
+
+        for size in (1, 5, 15):
+            request = self.make_request(flowers[:size])
+            # One query for the flowers, main image urls live on the row
+            with self.assertNumQueries(1):
+                context = get_cart_context(request)
+            self.assertEqual(len(context['cart_items']), size)
+            self.assertEqual(context['cart_count'], size * 2)
+
+    def test_cart_context_is_memoized_on_request(self):
+        request = self.make_request([create_flower(1)])
+        context = get_cart_context(request)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_cart_context(request), context)
+
+    def test_cart_items_use_sale_price_and_main_image(self):
+        flower = create_flower(1, sale_price_amd=500)
+        context = get_cart_context(self.make_request([flower]))
+
+        item = context['cart_items'][0]
+        self.assertEqual(item['image'], 'https://example.com/1.jpg')
+        self.assertEqual(item['sale_subtotal'], 1000.0)
+        self.assertEqual(context['cart_total'], 1000.0)
+
+    def test_inactive_flowers_are_skipped(self):
+        flower = create_flower(1, is_active=False)
+        context = get_cart_context(self.make_request([flower]))
+
+        self.assertEqual(context['cart_items'], [])
+        self.assertEqual(context['cart_count'], 0)
+
+
+    def test_fresh_snapshots_skip_the_database(self):
+        request = self.make_request([create_flower(i) for i in range(3)])
+        get_cart_context(request)
+
+        # A later request carrying the same snapshots needs no queries
+        next_request = self.factory.get('/')
+        next_request.session = request.session
+        next_request.cart = SessionCartStore(next_request)
+        with self.assertNumQueries(0):
+            context = get_cart_context(next_request)
+        self.assertEqual(len(context['cart_items']), 3)
+
+    def test_catalog_change_revalidates_snapshots(self):
+        flower = create_flower(1)
+        request = self.make_request([flower])
+        get_cart_context(request)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flower.sale_price_amd = 500
+            flower.save()
+
+        next_request = self.factory.get('/')
+        next_request.session = request.session
+        next_request.cart = SessionCartStore(next_request)
+        with self.assertNumQueries(1):
+            context = get_cart_context(next_request)
+        self.assertEqual(context['cart_total'], 1000.0)
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        # Each gunicorn worker has its own LocMemCache
+        self.worker_a = LocMemCache('worker-a', {})
+        self.worker_b = LocMemCache('worker-b', {})
+        self.worker_a.clear()
+        self.worker_b.clear()
+
+    def version_in(self, worker):
+        with mock.patch('flowers.catalog.cache', worker):
+            return get_catalog_version()
+
+    def test_bump_in_one_worker_reaches_the_other(self):
+        before = self.version_in(self.worker_b)
+        with mock.patch('flowers.catalog.cache', self.worker_a):
+            bumped = bump_catalog_version()
+        self.assertGreater(bumped, before)
+
+        # Worker B trusts its cached value until CATALOG_VERSION_TTL runs out,
+        # then reads the shared row
+        self.assertEqual(self.version_in(self.worker_b), before)
+        self.worker_b.delete(CATALOG_VERSION_KEY)
+        self.assertEqual(self.version_in(self.worker_b), bumped)
+
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_without_ttl_every_read_sees_the_latest_bump(self):
+        self.version_in(self.worker_b)
+        with mock.patch('flowers.catalog.cache', self.worker_a):
+            bumped = bump_catalog_version()
+        self.assertEqual(self.version_in(self.worker_b), bumped)
+
+
+class CartContextProcessorTests(TestCase):
+    def setUp(self):
+        self.flower = create_flower(1)
+        self.request = RequestFactory().get('/')
+        self.request.session = SessionStore()
+        self.request.cart = SessionCartStore(self.request)
+        self.request.cart.save({str(self.flower.id): {'quantity': 3}})
+        # Workers keep the catalog version cached between requests
+        get_catalog_version()
+
+    def test_nothing_is_fetched_until_read(self):
+        with self.assertNumQueries(0):
+            context = cart(self.request)
+            self.assertEqual(str(context['cart_count']), '3')
+            self.assertTrue(context['cart_count'] > 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(context['cart_items']), 1)
+            self.assertEqual(float(str(context['cart_total'])), 3003.0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartStoreTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def round_trip(self, store_class, items=None):
+        """Save a cart with one store and read it back through the response cookies"""
+        request = self.factory.get('/')
+        request.session = SessionStore()
+        store = store_class(request)
+        self.assertEqual(store.items, {})
+        store.save(items or {'abc': {'quantity': 2}})
+        response = store.process_response(HttpResponse())
+
+        next_request = self.factory.get('/')
+        next_request.session = request.session
+        next_request.COOKIES = {key: morsel.value for key, morsel in response.cookies.items()}
+        return store_class(next_request)
+
+    def test_backends_round_trip(self):
+        for store_class in (SessionCartStore, SignedCookieCartStore, CacheCartStore):
+            with self.subTest(store=store_class.__name__):
+                store = self.round_trip(store_class)
+                self.assertEqual(store.items, {'abc': {'quantity': 2}})
+                self.assertEqual(store.count, 2)
+
+    @override_settings(CART_COOKIE_MAX_BYTES=300)
+    def test_cookie_cart_too_big_for_snapshots_keeps_quantities(self):
+        snapshot = {'quantity': 2, 'name': ''.join(uuid.uuid4().hex for _ in range(20)), 'version': 1}
+        store = self.round_trip(SignedCookieCartStore, {'abc': snapshot})
+        self.assertEqual(store.items, {'abc': {'quantity': 2}})
+
+    @override_settings(CART_COOKIE_MAX_BYTES=300)
+    def test_cookie_cart_that_cannot_fit_is_refused_unchanged(self):
+        store = self.round_trip(SignedCookieCartStore)
+        cart = store.items
+        for _ in range(20):
+            cart[str(uuid.uuid4())] = {'quantity': 1}
+        with self.assertRaises(CartFullError):
+            store.save(cart)
+        self.assertEqual(store.items, {'abc': {'quantity': 2}})
+        self.assertFalse(store.modified)
+
+    def test_browsing_does_not_touch_session(self):
+        response = self.client.get('/contact/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_tampered_cookie_is_ignored(self):
+        request = self.factory.get('/')
+        request.COOKIES = {'cart': '{"items":{"abc":{"quantity":99}},"count":99}'}
+        self.assertEqual(SignedCookieCartStore(request).count, 0)
+
+
+class CartEndpointTests(TestCase):
+    def setUp(self):
+        self.flower = create_flower(1)
+
+    def test_plain_post_redirects_to_cart(self):
+        response = self.client.post(reverse('add_to_cart', args=[self.flower.id]))
+        self.assertRedirects(response, reverse('cart'))
+
+    def test_json_answers_with_changed_line_and_totals(self):
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]))
+        response = self.client.post(
+            reverse('update_cart', args=[self.flower.id]),
+            {'action': 'increase'},
+            HTTP_ACCEPT='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['item']['quantity'], 2)
+        self.assertEqual(data['cart_count'], 2)
+        self.assertEqual(data['cart_total'], 2002.0)
+
+    @override_settings(CART_COOKIE_MAX_BYTES=10)
+    def test_full_cookie_cart_refuses_the_line(self):
+        response = self.client.post(
+            reverse('add_to_cart', args=[self.flower.id]), HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('cart', response.cookies)
+
+    def test_fragment_answers_with_removed_line(self):
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]))
+        response = self.client.post(
+            reverse('remove_from_cart', args=[self.flower.id]),
+            HTTP_HX_REQUEST='true',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cart-Count'], '0')
+        self.assertContains(response, 'data-removed')
+        self.assertContains(response, 'id="cart-badge"')
+
+
+class PlaceOrderTests(TestCase):
+    order_data = {
+        'customer_name': 'Test',
+        'customer_phone': '+37400000000',
+        'delivery_city': 'Yerevan',
+        'delivery_address': 'Street 1',
+    }
+
+    def test_query_count_is_constant_as_basket_grows(self):
+        flowers = [create_flower(i) for i in range(10)]
+
+        for size in (1, 10):
+            items = [{'flower_id': flower.id, 'quantity': 2} for flower in flowers[:size]]
+            # Savepoint, flowers, order insert, bulk item insert, two rollup upserts, release
+            with self.assertNumQueries(7):
+                order = place_order(self.order_data, items)
+            self.assertEqual(order.items.count(), size)
+
+    def test_total_uses_database_prices(self):
+        cheap = create_flower(1, sale_price_amd=Decimal('500.50'))
+        full = create_flower(2)
+
+        order = place_order(self.order_data, [
+            {'flower_id': cheap.id, 'quantity': 2},
+            {'flower_id': full.id, 'quantity': 1},
+        ])
+        self.assertEqual(order.total_amount_amd, Decimal('2003.00'))
+        self.assertEqual(
+            order.items.get(flower=cheap).flower_image_url, 'https://example.com/1.jpg'
+        )
+
+    def test_failure_leaves_no_orphan_order(self):
+        flower = create_flower(1)
+        inactive = create_flower(2, is_active=False)
+
+        with self.assertRaises(OrderPlacementError):
+            place_order(self.order_data, [
+                {'flower_id': flower.id, 'quantity': 1},
+                {'flower_id': inactive.id, 'quantity': 1},
+            ])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        flower = create_flower(1)
+        self.order = place_order(PlaceOrderTests.order_data, [{'flower_id': flower.id, 'quantity': 1}])
+
+    def test_queue_only_inserts_an_outbox_row(self):
+        queue_order_email('customer@example.com', self.order)
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertIn('Flower 1', email.body)
+
+    def test_worker_sends_batch_and_marks_rows_sent(self):
+        for _ in range(3):
+            queue_order_email('customer@example.com', self.order)
+
+        self.assertEqual(deliver_outbox_batch(batch_size=10), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailOutbox.objects.filter(status='sent').count(), 3)
+        self.assertEqual(deliver_outbox_batch(), 0)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        email = queue_order_email('customer@example.com', self.order)
+
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('boom')):
+            deliver_outbox_batch()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_outbox_batch(), 0)
+
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('boom')):
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox_batch(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProductCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flower = create_flower(1)
+
+    def get_flowers(self):
+        return Flower.objects.all()
+
+    def test_cards_are_rendered_once_and_reused(self):
+        first = product_cards(self.get_flowers())
+        self.assertIn('Flower 1', first[0])
+
+        with mock.patch('flowers.templatetags.flower_tags.render_to_string') as render:
+            second = product_cards(self.get_flowers())
+        render.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_flower_change_produces_a_new_card(self):
+        product_cards(self.get_flowers())
+        self.flower.name = 'Renamed'
+        self.flower.save()
+
+        self.assertIn('Renamed', product_cards(self.get_flowers())[0])
+
+    def test_new_main_image_produces_a_new_card(self):
+        product_cards(self.get_flowers())
+        FlowerImage.objects.create(flower=self.flower, url='https://example.com/new.jpg', is_main=True)
+
+        self.assertIn('https://example.com/new.jpg', product_cards(self.get_flowers())[0])
+
+
+@override_settings(
+    CATALOG_INDEX_ENABLED=True,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class CatalogIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.roses = create_flower(1)
+        self.tulips = create_flower(2, category='Տյուլիպաններ', colors=['Դեղին'])
+        self.hidden = create_flower(3, is_active=False)
+
+    def test_filters_match_the_orm(self):
+        index = get_catalog_index()
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(list(index.filter()), [self.tulips, self.roses])
+        self.assertEqual(index.filter(category='Տյուլիպաններ'), [self.tulips])
+        self.assertEqual(index.filter(color='Կարմիր'), [self.roses])
+        self.assertEqual(index.filter(category='Վարդեր', color='Դեղին'), [])
+        self.assertEqual(index.filter(search='flower 2'), [self.tulips])
+        self.assertIsNone(index.get(self.hidden.id))
+
+    def test_index_is_rebuilt_when_catalog_version_changes(self):
+        index = get_catalog_index()
+        self.assertIs(get_catalog_index(), index)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hidden.is_active = True
+            self.hidden.save()
+        self.assertEqual(len(get_catalog_index()), 3)
+
+    def test_views_are_served_from_memory(self):
+        get_catalog_index()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('products'), {'color': 'Դեղին'})
+        self.assertContains(response, 'Flower 2')
+        self.assertNotContains(response, 'Flower 1')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product_detail', args=[self.hidden.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        flowers = [create_flower(i) for i in range(8)]
+        # Several rows share a timestamp so the id tie-break is exercised
+        same_time = timezone.now()
+        Flower.objects.filter(id__in=[f.id for f in flowers[2:6]]).update(created_at=same_time)
+        bump_catalog_version()
+        self.expected = list(Flower.objects.order_by('-created_at', '-id'))
+
+    def walk(self, object_list):
+        paginator = KeysetPaginator(object_list, 3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        # Walking back with the previous tokens returns the same pages
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(paginator.get_page(back[-1].previous_cursor))
+        self.assertEqual(
+            [list(page) for page in reversed(back)], [list(page) for page in pages]
+        )
+        return [flower for page in pages for flower in page]
+
+    def test_queryset_pages_follow_listing_order(self):
+        self.assertEqual(self.walk(Flower.objects.all()), self.expected)
+
+    def test_catalog_index_pages_match_queryset(self):
+        self.assertEqual(self.walk(get_catalog_index().filter()), self.expected)
+
+    def test_cursor_mode_on_products_page(self):
+        response = self.client.get(reverse('products'), {'cursor': ''})
+        page = response.context['flowers']
+        self.assertEqual(list(page), self.expected[:21])
+        self.assertFalse(page.has_previous)
+
+        response = self.client.get(reverse('products'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_tampered_cursors_give_the_first_page(self):
+        for payload in (
+            ['2024-01-01T00:00:00+00:00', 'not-a-uuid', 'next'],
+            ['2024-01-01T00:00:00', str(self.expected[0].id), 'next'],
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+            response = self.client.get(reverse('products'), {'cursor': cursor})
+            self.assertEqual(list(response.context['flowers']), self.expected[:21])
+
+
+class FullTextSearchTests(TestCase):
+    def test_prefix_query_matches_every_term(self):
+        self.assertEqual(build_prefix_query('Կարմիր  վարդեր, 5!'), 'կարմիր:* & վարդեր:* & 5:*')
+        self.assertEqual(build_prefix_query(' _ ,'), '')
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_results_are_ranked_and_prefix_matched(self):
+        in_name = create_flower(1, name='Կարմիր վարդեր')
+        in_description = create_flower(2, description='Փունջ կարմիր վարդերով')
+        create_flower(3, name='Դեղին տյուլիպաններ')
+
+        results = list(search_flowers(Flower.objects.all(), 'վարդ'))
+        self.assertEqual(results, [in_name, in_description])
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.roses = create_flower(1, name='Կարմիր վարդեր')
+        self.tulips = create_flower(2, name='Դեղին տյուլիպաններ', category='Տյուլիպաններ')
+
+    def test_trie_matches_names_words_and_categories(self):
+        trie = SuggestionTrie([
+            {'type': 'flower', 'name': 'Կարմիր վարդեր', 'id': '1'},
+            {'type': 'flower', 'name': 'Վարդ', 'id': '2'},
+            {'type': 'category', 'name': 'Վարդեր', 'id': None},
+        ], version=0)
+
+        self.assertEqual([e['name'] for e in trie.search('վարդ')], ['Վարդ', 'Վարդեր', 'Կարմիր վարդեր'])
+        self.assertEqual([e['name'] for e in trie.search('ԿԱՐՄԻՐ  վ')], ['Կարմիր վարդեր'])
+        self.assertEqual(trie.search('վարդ', limit=1)[0]['id'], '2')
+        self.assertEqual(trie.search('տ'), [])
+
+    def test_trie_is_rebuilt_when_catalog_changes(self):
+        trie = get_suggestion_trie()
+        self.assertIs(get_suggestion_trie(), trie)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_flower(3, name='Սպիտակ խոլորձ')
+        self.assertEqual(get_suggestion_trie().search('սպի')[0]['name'], 'Սպիտակ խոլորձ')
+
+    def test_endpoint_returns_suggestions(self):
+        get_suggestion_trie()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('suggest'), {'q': 'տյու'})
+        names = [s['name'] for s in response.json()['suggestions']]
+        self.assertEqual(names, ['Տյուլիպաններ', 'Դեղին տյուլիպաններ'])
+
+        response = self.client.get(reverse('suggest'), {'q': ' '})
+        self.assertEqual(response.json()['suggestions'], [])
+
+
+class MainImageUrlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_image_writes_keep_main_image_url_in_sync(self):
+        flower = create_flower(1)
+        flower.refresh_from_db()
+        self.assertEqual(flower.main_image_url, 'https://example.com/1.jpg')
+
+        second = flower.images.get(is_main=False)
+        second.is_main = True
+        second.save()
+        flower.refresh_from_db()
+        self.assertEqual(flower.main_image_url, 'https://example.com/1-2.jpg')
+
+        second.delete()
+        flower.refresh_from_db()
+        self.assertEqual(flower.main_image_url, '')
+
+    def test_version_is_bumped_after_the_main_image_url_moves(self):
+        flower = create_flower(1)
+        second = flower.images.get(is_main=False)
+        seen = []
+
+        def bump():
+            seen.append(Flower.objects.get(pk=flower.pk).main_image_url)
+
+        # Outside a transaction on_commit callbacks run right away
+        with mock.patch('flowers.signals.transaction.on_commit', lambda func: func()), \
+                mock.patch('flowers.signals.bump_catalog_version', bump):
+            second.is_main = True
+            second.save()
+            second.delete()
+        self.assertEqual(seen, ['https://example.com/1-2.jpg', ''])
+
+    def test_listing_does_not_join_images(self):
+        for i in range(5):
+            create_flower(i)
+        get_catalog_version()
+
+        # Session-less anonymous listing: the page of flowers, its count and the facets
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('products'))
+        self.assertContains(response, 'https://example.com/4.jpg')
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_flower(1, colors=['Կարմիր', 'Սպիտակ'])
+        create_flower(2, colors=['Կարմիր'])
+        create_flower(3, category='Տյուլիպաններ', colors=['Դեղին'])
+        create_flower(4, category='Տյուլիպաններ', colors=['Կարմիր'], is_active=False)
+
+    def test_each_dimension_respects_the_other_filter(self):
+        facets = get_facets(Flower.objects.filter(is_active=True), 'Վարդեր', 'Կարմիր', {})
+        # Category counts ignore the category filter but apply the color one
+        self.assertEqual(facets['categories'], {'Վարդեր': 2})
+        # Color counts ignore the color filter but apply the category one
+        self.assertEqual(facets['colors'], {'Կարմիր': 2, 'Սպիտակ': 1})
+
+        unfiltered = get_facets(Flower.objects.filter(is_active=True), 'բոլորը', 'բոլորը', {})
+        self.assertEqual(unfiltered['categories'], {'Վարդեր': 2, 'Տյուլիպաններ': 1})
+
+    def test_counts_are_cached_per_catalog_version(self):
+        get_facets(Flower.objects.filter(is_active=True), 'բոլորը', 'բոլորը', {})
+        with self.assertNumQueries(0):
+            get_facets(Flower.objects.filter(is_active=True), 'բոլորը', 'բոլորը', {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_flower(5, category='Խոլորձներ')
+        facets = get_facets(Flower.objects.filter(is_active=True), 'բոլորը', 'բոլորը', {})
+        self.assertEqual(facets['categories']['Խոլորձներ'], 1)
+
+    def test_empty_options_are_hidden_unless_selected(self):
+        choices = [('բոլորը', 'Բոլորը'), ('Վարդեր', 'Վարդեր'), ('Լիլիաներ', 'Լիլիաներ'), ('Խառը', 'Խառը')]
+        options = facet_options(choices, {'Վարդեր': 2, 'Նոր': 1}, 'Խառը')
+        self.assertEqual(options, [
+            ('բոլորը', 'Բոլորը', None), ('Վարդեր', 'Վարդեր', 2), ('Խառը', 'Խառը', 0), ('Նոր', 'Նոր', 1),
+        ])
+        self.assertEqual(len(facet_options(choices, None, '')), 4)
+        self.assertEqual(count_facets_python([('Վարդեր', ['Կարմիր', 'Կարմիր'])], None, None)['colors'], {'Կարմիր': 1})
+
+
+class EffectivePriceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cheap = create_flower(1, price_amd=5000)
+        self.on_sale = create_flower(2, price_amd=9000, sale_price_amd=3000)
+        self.dear = create_flower(3, price_amd=8000)
+
+    def get_listing(self, **params):
+        return list(self.client.get(reverse('products'), params).context['flowers'])
+
+    def test_price_range_uses_sale_price_when_set(self):
+        self.assertEqual(self.get_listing(max_price='5000', sort='price_asc'), [self.on_sale, self.cheap])
+        self.assertEqual(self.get_listing(min_price='4000', max_price='8500'), [self.dear, self.cheap])
+        # Invalid bounds are ignored
+        self.assertEqual(len(self.get_listing(min_price='abc', max_price='NaN')), 3)
+
+    def test_price_sorts(self):
+        self.assertEqual(self.get_listing(sort='price_asc'), [self.on_sale, self.cheap, self.dear])
+        self.assertEqual(self.get_listing(sort='price_desc'), [self.dear, self.cheap, self.on_sale])
+        self.assertEqual(self.get_listing(sort='newest'), [self.dear, self.on_sale, self.cheap])
+
+    def test_pagination_links_keep_filters(self):
+        for i in range(25):
+            create_flower(10 + i, price_amd=100)
+        response = self.client.get(reverse('products'), {'max_price': '100', 'sort': 'price_desc'})
+        self.assertContains(response, '?page=2&max_price=100&amp;sort=price_desc')
+
+
+class CountingPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            create_flower(i)
+
+    def test_cached_count_is_reused_until_catalog_changes(self):
+        queryset = Flower.objects.filter(is_active=True, price_amd__gte=1000)
+        self.assertEqual(CountingPaginator(queryset, 2, count_mode='cached').count, 3)
+
+        with self.assertNumQueries(0):
+            # Same filters built again share the cache entry
+            same = Flower.objects.filter(is_active=True, price_amd__gte=1000)
+            self.assertEqual(CountingPaginator(same, 2, count_mode='cached').count, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_flower(4)
+        self.assertEqual(CountingPaginator(queryset, 2, count_mode='cached').count, 4)
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=1)
+    def test_estimate_falls_back_to_exact_count_without_planner_estimates(self):
+        paginator = CountingPaginator(Flower.objects.all(), 2, count_mode='estimate')
+        if connection.vendor == 'postgresql':
+            self.assertGreaterEqual(paginator.count, 0)
+            self.assertTrue(paginator.count_is_estimate)
+        else:
+            self.assertEqual(paginator.count, 3)
+            self.assertFalse(paginator.count_is_estimate)
+
+
+class ProjectedListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flower = create_flower(1, description='Երկար ' * 2000)
+
+    def test_listing_loads_an_excerpt_instead_of_the_description(self):
+        response = self.client.get(reverse('products'))
+        flower = list(response.context['flowers'])[0]
+        self.assertIn('description', flower.get_deferred_fields())
+        self.assertEqual(len(flower.card_description), 200)
+        self.assertContains(response, 'Երկար Երկար')
+
+        # The detail page keeps the full row
+        response = self.client.get(reverse('product_detail', args=[self.flower.id]))
+        self.assertEqual(response.context['product'].get_deferred_fields(), set())
+
+    def test_list_serializer_uses_slim_queries(self):
+        queryset = FlowerListSerializer.setup_queryset(Flower.objects.all())
+        # Flowers and their images
+        with self.assertNumQueries(2):
+            data = FlowerListSerializer(queryset, many=True).data
+        self.assertEqual(len(data[0]['description']), 200)
+        self.assertEqual(data[0]['images'][0]['url'], 'https://example.com/1.jpg')
+        self.assertNotIn('created_at', data[0])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flower = create_flower(1)
+
+    def test_unchanged_page_is_answered_with_304_without_queries(self):
+        response = self.client.get(reverse('products'))
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog_and_cart_changes_produce_a_new_etag(self):
+        url = reverse('product_detail', args=[self.flower.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flower.name = 'Renamed'
+            self.flower.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        self.client.cookies.pop('messages', None)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_disable_the_validators(self):
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'Flower 1')
+
+    def test_last_modified_is_only_sent_without_per_visitor_content(self):
+        last_modified = self.client.get(reverse('products'))['Last-Modified']
+        response = self.client.get(reverse('products'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        response = self.client.get(reverse('products'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.client.cookies.pop('messages', None)
+        response = self.client.get(reverse('products'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+
+
+class HomePageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.featured = create_flower(1, to_be_on_main_page=True)
+        create_flower(2)
+
+    def test_singleton_is_created_by_migration(self):
+        self.assertTrue(MainPageContent.objects.filter(id=MainPageContent.SINGLETON_ID).exists())
+
+    def test_cached_home_page_runs_no_queries(self):
+        get_home_page()
+        with self.assertNumQueries(0):
+            home_page = get_home_page()
+        self.assertEqual([f.pk for f in home_page['featured_flowers']], [self.featured.pk])
+
+    def test_content_and_featured_changes_invalidate_the_cache(self):
+        get_home_page()
+        with self.captureOnCommitCallbacks(execute=True):
+            content = MainPageContent.objects.get(id=MainPageContent.SINGLETON_ID)
+            content.title = 'New title'
+            content.save()
+        self.assertEqual(get_home_page()['main_content'].title, 'New title')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.featured.to_be_on_main_page = False
+            self.featured.save()
+        self.assertEqual(get_home_page()['featured_flowers'], [])
+
+    def test_unrelated_flower_change_keeps_the_cache(self):
+        get_home_page()
+        with self.captureOnCommitCallbacks(execute=True):
+            Flower.objects.get(name='Flower 2').save()
+        self.assertIsNotNone(cache.get(HOME_PAGE_KEY))
+
+    def test_waits_for_a_concurrent_fill(self):
+        cache.add(HOME_PAGE_LOCK_KEY, 1)
+        filled = {'main_content': None, 'featured_flowers': []}
+
+        def fill_during_wait(seconds):
+            cache.set(HOME_PAGE_KEY, filled)
+
+        with mock.patch('flowers.homepage.time.sleep', side_effect=fill_during_wait), \
+                self.assertNumQueries(0):
+            self.assertEqual(get_home_page(), filled)
+
+
+def create_order(index, **kwargs):
+    fields = {
+        'customer_name': f'Customer {index}',
+        'customer_phone': f'+3749900{index:04d}',
+        'delivery_city': 'Yerevan',
+        'delivery_address': 'Street 1',
+        'total_amount_amd': 1000,
+    }
+    fields.update(kwargs)
+    order = Order.objects.create(**fields)
+    OrderItem.objects.create(order=order, flower_name='Rose', price_amd_at_purchase=1000, quantity=1)
+    return order
+
+
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user('admin', password='secret', is_staff=True)
+        self.client.force_login(user)
+        for index in range(12):
+            create_order(index, status='delivered' if index % 3 == 0 else 'pending')
+        create_flower(1)
+
+    def test_orders_are_paginated_with_cursors(self):
+        response = self.client.get(reverse('admin_dashboard'), {'tab': 'orders', 'order_page_size': 10})
+        orders = response.context['orders']
+        self.assertEqual(len(orders['page']), 10)
+        self.assertEqual(orders['count'], 12)
+        self.assertIn('order_cursor=', orders['next_url'])
+        self.assertIn('tab=orders', orders['next_url'])
+
+        response = self.client.get(reverse('admin_dashboard') + orders['next_url'])
+        second = response.context['orders']['page']
+        self.assertEqual(len(second), 2)
+        seen = {order.pk for order in orders['page']} | {order.pk for order in second}
+        self.assertEqual(len(seen), 12)
+
+    def test_status_date_and_search_filters(self):
+        url = reverse('admin_dashboard')
+        response = self.client.get(url, {'order_status': 'delivered'})
+        self.assertEqual(response.context['orders']['count'], 4)
+
+        today = timezone.localdate()
+        response = self.client.get(url, {'order_from': (today + timedelta(days=1)).isoformat()})
+        self.assertEqual(response.context['orders']['count'], 0)
+        response = self.client.get(url, {'order_from': today.isoformat(), 'order_to': today.isoformat()})
+        self.assertEqual(response.context['orders']['count'], 12)
+
+        response = self.client.get(url, {'order_search': 'Customer 11'})
+        self.assertEqual([o.customer_name for o in response.context['orders']['page']], ['Customer 11'])
+
+    def test_query_count_does_not_grow_with_history(self):
+        url = reverse('admin_dashboard')
+        self.client.get(url, {'order_page_size': 10})
+        for index in range(12, 40):
+            create_order(index)
+        # Sections: user, main content, flowers page + count, orders page + items + count, 4 rollup reads
+        with self.assertNumQueries(11):
+            response = self.client.get(url, {'order_page_size': 10})
+        self.assertEqual(len(response.context['orders']['page']), 10)
+
+    def test_sales_stats_endpoint(self):
+        today = timezone.localdate()
+        rebuild_rollup(today, today)
+        response = self.client.get(reverse('admin_sales_stats'), {'stats_from': today.isoformat()})
+        by_status = {row['status']: row['orders'] for row in response.json()['by_status']}
+        self.assertEqual(by_status, {'delivered': 4, 'pending': 8})
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('admin', password='secret', is_staff=True)
+        self.client.force_login(user)
+        self.orders = [create_order(index, status='delivered' if index % 2 else 'pending') for index in range(5)]
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_one_row_per_item(self):
+        response = self.client.get(reverse('admin_export_orders'), {'format': 'csv', 'order_status': 'delivered'})
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0][:3], ['id', 'created_at', 'status'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[2] for row in rows[1:]}, {'delivered'})
+
+    def test_csv_export_keeps_orders_without_items(self):
+        self.orders[0].items.all().delete()
+        response = self.client.get(reverse('admin_export_orders'), {'format': 'csv'})
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual([row[0] for row in rows[1:]], [str(order.id) for order in self.orders])
+        self.assertEqual(rows[1][len(ORDER_COLUMNS):], [''] * 4)
+
+    def test_csv_export_neutralises_formulas(self):
+        create_order(9, customer_name='=HYPERLINK("http://evil.example","x")', delivery_notes='@SUM(A1)')
+        response = self.client.get(reverse('admin_export_orders'), {'format': 'csv'})
+        row = list(csv.reader(io.StringIO(self.read(response))))[-1]
+        self.assertEqual(row[ORDER_COLUMNS.index('customer_name')], '\'=HYPERLINK("http://evil.example","x")')
+        self.assertEqual(row[ORDER_COLUMNS.index('delivery_notes')], "'@SUM(A1)")
+        self.assertEqual(row[ORDER_COLUMNS.index('delivery_city')], 'Yerevan')
+
+    def test_ndjson_export_nests_items(self):
+        response = self.client.get(reverse('admin_export_orders'), {'format': 'ndjson'})
+        records = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([record['id'] for record in records], [str(order.id) for order in self.orders])
+        self.assertEqual(records[0]['items'][0]['flower_name'], 'Rose')
+
+    def test_export_command_filters_by_date(self):
+        out = io.StringIO()
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        call_command('export_orders', '--format', 'ndjson', '--from', tomorrow.isoformat(), stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+        call_command('export_orders', '--format', 'ndjson', '--status', 'pending', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+class BulkOrderStatusTests(TestCase):
+    def setUp(self):
+        self.pending = [create_order(index) for index in range(3)]
+        self.delivered = create_order(3, status='delivered')
+
+    def test_one_conditional_update_with_per_order_results(self):
+        ids = [order.id for order in self.pending] + [self.delivered.id, uuid.uuid4(), 'junk']
+        # Savepoint, lock, update, items, two rollup upserts, release
+        with self.assertNumQueries(7):
+            results = bulk_change_order_status(ids, 'processing')
+
+        self.assertEqual(list(results.values()), ['updated'] * 3 + ['not_allowed', 'not_found', 'not_found'])
+        self.assertEqual(Order.objects.filter(status='processing').count(), 3)
+        self.delivered.refresh_from_db()
+        self.assertEqual(self.delivered.status, 'delivered')
+
+        results = bulk_change_order_status([self.pending[0].id], 'processing')
+        self.assertEqual(results, {str(self.pending[0].id): 'unchanged'})
+
+    def test_final_statuses_cannot_be_left(self):
+        with self.assertRaises(OrderStatusError):
+            change_order_status(self.delivered.id, 'pending')
+
+    def test_endpoint_returns_results(self):
+        user = get_user_model().objects.create_user('admin', password='secret', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.post(reverse('admin_bulk_order_status'), {
+            'status': 'cancelled',
+            'order_ids': [self.pending[0].id, self.delivered.id],
+        })
+        self.assertEqual(response.json()['results'], {
+            str(self.pending[0].id): 'updated',
+            str(self.delivered.id): 'not_allowed',
+        })
+        self.assertEqual(DailySalesRollup.objects.get(status='cancelled', flower_id=None).order_count, 1)
+
+
+class SalesRollupTests(TestCase):
+    order_data = PlaceOrderTests.order_data
+
+    def setUp(self):
+        self.rose = create_flower(1, sale_price_amd=Decimal('500'))
+        self.lily = create_flower(2, category='Լիլիաներ')
+
+    def place(self, *quantities):
+        flowers = [self.rose, self.lily]
+        return place_order(self.order_data, [
+            {'flower_id': flower.id, 'quantity': quantity}
+            for flower, quantity in zip(flowers, quantities) if quantity
+        ])
+
+    def rollup(self):
+        return {
+            (row.status, row.flower_name or None): (row.order_count, row.item_count, row.revenue_amd)
+            for row in DailySalesRollup.objects.all()
+        }
+
+    def test_orders_and_status_changes_update_the_rollup(self):
+        first = self.place(2, 1)
+        self.place(1, 0)
+        change_order_status(first.pk, 'cancelled')
+
+        self.assertEqual(self.rollup(), {
+            ('pending', None): (1, 1, Decimal('500')),
+            ('pending', 'Flower 1'): (1, 1, Decimal('500')),
+            ('pending', 'Flower 2'): (0, 0, Decimal('0')),
+            ('cancelled', None): (1, 3, Decimal('2002')),
+            ('cancelled', 'Flower 1'): (1, 2, Decimal('1000')),
+            ('cancelled', 'Flower 2'): (1, 1, Decimal('1002')),
+        })
+
+    def test_rebuild_matches_incremental_rollup(self):
+        first = self.place(2, 1)
+        self.place(1, 3)
+        change_order_status(first.pk, 'delivered')
+        incremental = {key: value for key, value in self.rollup().items() if value[0]}
+
+        today = timezone.localdate()
+        DailySalesRollup.objects.all().delete()
+        rebuild_rollup(today, today)
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_rebuild_matches_incremental_rollup_for_deleted_flowers(self):
+        # Its only item has lost its flower
+        order = create_order(1, status='delivered')
+        record_status_changes([(order, 'pending', 'delivered')])
+        rows = DailySalesRollup.objects.filter(status='delivered').order_by('flower_id').values_list(
+            'flower_id', 'flower_name', 'order_count', 'item_count', 'revenue_amd'
+        )
+        incremental = list(rows)
+
+        today = timezone.localdate()
+        DailySalesRollup.objects.all().delete()
+        rebuild_rollup(today, today)
+        self.assertEqual(list(rows), incremental)
+        self.assertIn((DailySalesRollup.UNKNOWN_FLOWER_ID, '', 1, 1, Decimal('1000')), incremental)
+
+    def test_rebuild_command_rejects_empty_chunks(self):
+        with self.assertRaises(CommandError):
+            call_command('rebuild_sales_rollup', '--chunk-days', '0', stdout=io.StringIO())
+
+    def test_stats_read_only_the_rollup(self):
+        self.place(2, 1)
+        self.place(0, 1)
+        today = timezone.localdate()
+
+        with self.assertNumQueries(4):
+            stats = sales_stats(today - timedelta(days=6), today)
+        self.assertEqual(stats['daily'][0]['revenue'], Decimal('3004'))
+        self.assertEqual([row['name'] for row in stats['top_flowers']], ['Flower 2', 'Flower 1'])
+        self.assertEqual({row['category'] for row in stats['categories']}, {'Վարդեր', 'Լիլիաներ'})
+
+
+class IdempotentCheckoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flower = create_flower(1)
+        self.form = {
+            'fullName': 'Test',
+            'phone': '+37400000000',
+            'city': 'Yerevan',
+            'address': 'Street 1',
+            'email': 'test@example.com',
+            'paymentMethod': 'cash',
+            'idempotency_key': 'checkout-key-1',
+        }
+
+    def test_resubmitted_checkout_places_one_order(self):
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        self.assertIn('idempotency_key', self.client.get(reverse('checkout')).context)
+
+        for _ in range(2):
+            response = self.client.post(reverse('checkout'), self.form)
+            self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().order, Order.objects.get())
+
+    def test_keys_are_scoped_to_the_client(self):
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        self.client.get(reverse('checkout'))
+        self.client.post(reverse('checkout'), self.form)
+
+        # Another browser sending the same key is not told about that order
+        other = Client()
+        other.get(reverse('checkout'))
+        self.assertRedirects(other.post(reverse('checkout'), self.form), reverse('cart'),
+                             fetch_redirect_response=False)
+
+        other.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 2})
+        other.get(reverse('checkout'))
+        self.assertRedirects(other.post(reverse('checkout'), self.form), reverse('home'),
+                             fetch_redirect_response=False)
+        self.assertEqual(sorted(OrderItem.objects.values_list('quantity', flat=True)), [1, 2])
+        self.assertEqual(IdempotencyKey.objects.filter(key='checkout-key-1').count(), 2)
+
+    def test_reused_key_with_a_different_order_is_rejected(self):
+        items = [{'flower_id': self.flower.id, 'quantity': 1}]
+        order, _ = place_order_once('api-key', PlaceOrderTests.order_data, items, scope='user:1')
+        with self.assertRaises(OrderPlacementError):
+            place_order_once('api-key', PlaceOrderTests.order_data, [{'flower_id': self.flower.id, 'quantity': 3}],
+                             scope='user:1')
+        with self.assertRaises(OrderPlacementError):
+            place_order_once('api-key', dict(PlaceOrderTests.order_data, customer_name='Other'), items,
+                             scope='user:1')
+
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 1})
+        self.client.get(reverse('checkout'))
+        self.client.post(reverse('checkout'), self.form)
+        self.client.post(reverse('add_to_cart', args=[self.flower.id]), {'quantity': 5})
+        response = self.client.post(reverse('checkout'), self.form)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_header_key_returns_the_original_order(self):
+        items = [{'flower_id': self.flower.id, 'quantity': 1}]
+        order, created = place_order_once('api-key', PlaceOrderTests.order_data, items)
+        self.assertTrue(created)
+
+        # One indexed lookup, nothing placed
+        with self.assertNumQueries(1):
+            again, created = place_order_once('api-key', PlaceOrderTests.order_data, items)
+        self.assertFalse(created)
+        self.assertEqual(again, order)
+
+    def test_purge_deletes_expired_keys_in_batches(self):
+        items = [{'flower_id': self.flower.id, 'quantity': 1}]
+        for index in range(3):
+            place_order_once(f'key-{index}', PlaceOrderTests.order_data, items)
+        IdempotencyKey.objects.filter(key__in=['key-0', 'key-1']).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        call_command('purge_idempotency_keys', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['key-2'])
+
+        for option in ('--batch-size', '--ttl-hours'):
+            with self.assertRaises(CommandError):
+                call_command('purge_idempotency_keys', option, '0', stdout=io.StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 3)
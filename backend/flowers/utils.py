@@ -1,23 +1,35 @@
+import logging
 import os
-from django.core.mail import EmailMessage
+from datetime import timedelta
 
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
 
+from .models import EmailOutbox
 from .templates import Templates
 
-def send_order_email(to, order):
+logger = logging.getLogger(__name__)
+
+# Retry schedule for failed deliveries: 30s, 1m, 2m, ... capped at one hour
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+
+
+def build_order_email(order):
     """
-    Send the order completed email to the customer.
+    Build the subject and HTML body of the order completed email.
     `order` is an instance of your Order model.
     """
 
-    # Build items rows for the table
+    # Build items rows for the table from the purchase snapshot
     items_rows = ""
-    for item in order.items.all():  # assuming items is related name
+    for item in order.items.all():
         items_rows += f"""
         <tr>
-            <td>{item.flower.name}</td>
+            <td>{item.flower_name}</td>
             <td>{item.quantity}</td>
-            <td>{item.flower.price_amd}</td>
+            <td>{item.price_amd_at_purchase}</td>
         </tr>
         """
 
@@ -34,13 +46,82 @@ def send_order_email(to, order):
         created_at=order.created_at.strftime("%Y-%m-%d %H:%M"),
         items_rows=items_rows
     )
+    return subject, body
 
-    email = EmailMessage(
-        subject=subject,
-        body=body,
-        from_email=os.getenv('EMAIL_HOST_USER'),
-        to=[to],
-    )
-    email.content_subtype = "html"
-    email.send()
-    print('email sent ')
\ No newline at end of file
+
+def queue_order_email(to, order):
+    """
+    Queue the order completed email for the customer.
+    Only an outbox row is inserted here; the process_email_outbox worker
+    does the actual SMTP delivery outside the request.
+    """
+    subject, body = build_order_email(order)
+    return EmailOutbox.objects.create(order=order, to=to, subject=subject, body=body)
+
+
+def retry_delay(attempts):
+    """Exponential backoff for the given number of failed attempts"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def deliver_outbox_batch(batch_size=50, max_attempts=8):
+    """
+    Deliver one batch of due outbox emails.
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can run side by side, and the whole batch is sent over one
+    reused SMTP connection. Returns the number of rows processed.
+    """
+    with transaction.atomic():
+        emails = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                next_attempt_at__lte=timezone.now()
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if not emails:
+            return 0
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            logger.warning('Could not connect to the mail server: %s', e)
+            connection = None
+
+        for email in emails:
+            try:
+                if connection is None:
+                    raise ConnectionError('Mail server unavailable')
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=os.getenv('EMAIL_HOST_USER'),
+                    to=[email.to],
+                    connection=connection,
+                )
+                message.content_subtype = "html"
+                message.send()
+            except Exception as e:
+                email.attempts += 1
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = 'failed'
+                    logger.error('Giving up on email %s after %s attempts: %s', email.id, email.attempts, e)
+                else:
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    logger.warning('Email %s failed (attempt %s): %s', email.id, email.attempts, e)
+            else:
+                email.attempts += 1
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                logger.info('Email %s sent to %s', email.id, email.to)
+
+        if connection is not None:
+            connection.close()
+
+        EmailOutbox.objects.bulk_update(
+            emails,
+            ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+
+    return len(emails)